@@ -1,24 +1,74 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, g
 import os
 import json
-from data_processor import MusicDataProcessor
+import threading
+import time
+from data_processor import MusicDataProcessor, FILTERABLE_ANALYSES
+from filter_index import CATEGORY_FILTERS, YEAR_FILTERS
+from http_cache import (CompressedResponseCache, COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_SIZE,
+                        choose_encoding, compress)
+import metrics
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
 # 全局变量存储数据处理器
+# 重新加载时在后台构建新的处理器，完成后整体替换；正在处理的请求继续使用旧对象
 processor = None
 data_loaded = False
 
+# 由wsgi.py设置：新处理器构建完成后先换成缓存文件的内存映射再替换，重新加载后内存仍可共享
+REMAP_FROM_CACHE = False
+# 由gunicorn.conf.py设置为工作进程数；多于一个时各进程的数据和重新加载状态互相独立，不支持在线重新加载
+worker_count = 1
+
+# 后台重新加载的状态
+_reload_lock = threading.Lock()
+_loading_processor = None  # 正在后台构建的处理器
+reload_status = {
+    'running': False,
+    'started_at': None,
+    'finished_at': None,
+    'success': None,
+    'count': 0,  # 完成的重新加载次数
+}
+
 # 数据文件路径
 DATA_FILE = os.path.join(os.path.dirname(__file__), 'netease_music_data.csv')
 # 备用文件路径（兼容旧数据）
 SPOTIFY_DATA_FILE = os.path.join(os.path.dirname(__file__), 'spotify_tracks.csv')
+# 流式模式：分块统计网易云音乐数据，不在内存中保留完整数据表
+STREAMING_MODE = os.environ.get('STREAMING_MODE', 'False').lower() == 'true'
+# 聚类引擎：'kmeans'（精确）或 'minibatch'（近似，适合大数据集）
+CLUSTER_ENGINE = os.environ.get('CLUSTER_ENGINE', 'kmeans')
+# 簇数量，设为 'auto' 时在2-10之间并行评估并自动选择
+N_CLUSTERS = os.environ.get('N_CLUSTERS', '5')
+N_CLUSTERS = N_CLUSTERS if N_CLUSTERS == 'auto' else int(N_CLUSTERS)
+# 分页接口单次最多返回的记录数
+MAX_PAGE_SIZE = 500
+# 相似音乐查询的邻居数量和批量查询的种子数量上限
+MAX_NEIGHBORS = 100
+MAX_SIMILAR_SEEDS = 1000
+# 接口响应格式的版本，与数据版本一起组成ETag；接口返回内容的含义变化时递增，
+# 使部署后浏览器缓存的旧响应失效（数据版本相同时也不会得到304）
+API_VERSION = 2
+# 内容不只取决于数据版本、不能按版本缓存的接口
+UNCACHED_API_PATHS = {'/api/status', '/api/reload', '/api/reload/status'}
+
+# 按数据版本缓存的压缩响应
+compressed_responses = CompressedResponseCache()
+
+# 各接口的延迟直方图，标签为 (路由, 方法, 状态码)
+request_latency = metrics.LatencyHistogram()
 
 
 def initialize_processor():
-    """初始化数据处理器并加载数据"""
-    global processor, data_loaded
+    """
+    初始化数据处理器并加载数据
+    
+    新的处理器完全构建好后才替换全局处理器；加载失败时保留原来的处理器
+    """
+    global processor, data_loaded, _loading_processor
     
     # 优先使用网易云音乐数据，如果不存在则使用Spotify数据
     data_file = DATA_FILE if os.path.exists(DATA_FILE) else SPOTIFY_DATA_FILE
@@ -29,15 +79,165 @@ def initialize_processor():
         return False
     
     try:
-        processor = MusicDataProcessor(n_clusters=5)
-        success = processor.process_pipeline(data_file)
-        data_loaded = success
-        return success
+        new_processor = MusicDataProcessor(n_clusters=N_CLUSTERS, streaming=STREAMING_MODE,
+                                           cluster_engine=CLUSTER_ENGINE)
+        _loading_processor = new_processor
+        if not new_processor.process_pipeline(data_file):
+            return False
+        if REMAP_FROM_CACHE and new_processor.remap_from_cache():
+            print("数据已映射到共享内存")
+        
+        processor = new_processor
+        data_loaded = True
+        return True
     except Exception as e:
         print(f"初始化失败: {e}")
         import traceback
         traceback.print_exc()
         return False
+    finally:
+        _loading_processor = None
+
+
+def _reload_worker():
+    """后台线程：构建新的处理器并替换"""
+    success = initialize_processor()
+    with _reload_lock:
+        reload_status['running'] = False
+        reload_status['finished_at'] = time.time()
+        reload_status['success'] = success
+        reload_status['count'] += 1
+
+
+def start_background_reload():
+    """
+    在后台线程中重新加载数据
+    
+    返回:
+        成功启动返回True，已有重新加载在进行时返回False
+    """
+    with _reload_lock:
+        if reload_status['running']:
+            return False
+        reload_status.update(running=True, started_at=time.time(), finished_at=None, success=None)
+    
+    threading.Thread(target=_reload_worker, name='reload', daemon=True).start()
+    return True
+
+
+def get_reload_status():
+    """返回重新加载的当前阶段和耗时"""
+    with _reload_lock:
+        status = dict(reload_status)
+    
+    loading = _loading_processor
+    status['stage'] = loading.stage if status['running'] and loading is not None else None
+    if status['started_at'] is not None:
+        end = time.time() if status['running'] else status['finished_at']
+        status['elapsed'] = round(end - status['started_at'], 3)
+    else:
+        status['elapsed'] = None
+    status['version'] = processor.snapshot.version if processor and processor.snapshot else None
+    return status
+
+
+@app.before_request
+def start_request_timer():
+    """记录接口请求的开始时间；需要在其他before_request之前注册，以包含缓存命中的请求"""
+    if request.path.startswith('/api/'):
+        g.request_started = time.perf_counter()
+
+
+@app.before_request
+def capture_processor():
+    """
+    请求开始时取一次当前处理器，接口函数、ETag和压缩缓存都使用这同一个对象；
+    后台重新加载在请求中途替换全局处理器时，响应内容和数据版本仍然一致
+    """
+    g.processor = processor if data_loaded else None
+
+
+@app.after_request
+def record_request_latency(response):
+    """按路由模板记录接口耗时；最先注册，因此在压缩等其他after_request之后执行"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_latency.observe((route, request.method, str(response.status_code)),
+                                time.perf_counter() - started)
+    return response
+
+
+def _is_cacheable_request():
+    """只读的分析接口才按数据版本缓存"""
+    return (request.method in ('GET', 'HEAD') and request.path.startswith('/api/')
+            and request.path not in UNCACHED_API_PATHS)
+
+
+def _etag(version):
+    """由接口版本和数据版本组成的ETag值"""
+    return f'api{API_VERSION}-{version}'
+
+
+def _set_cache_headers(response, version):
+    """以接口版本和数据版本作为ETag，要求客户端每次使用前重新验证"""
+    response.set_etag(_etag(version), weak=True)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.vary.add('Accept-Encoding')
+
+
+@app.before_request
+def serve_from_http_cache():
+    """
+    数据版本未变化时返回304；已有压缩结果时直接返回，不再执行接口函数
+    """
+    if not _is_cacheable_request():
+        return None
+    
+    current = g.processor
+    if current is None or current.snapshot is None:
+        return None
+    version = current.snapshot.version
+    g.data_version = version
+    
+    if request.if_none_match.contains_weak(_etag(version)):
+        response = app.response_class(status=304)
+        _set_cache_headers(response, version)
+        return response
+    
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    g.encoding = encoding
+    entry = compressed_responses.get(version, request.full_path, encoding) if encoding else None
+    if entry is not None:
+        body, mimetype = entry
+        response = app.response_class(body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        _set_cache_headers(response, version)
+        return response
+    return None
+
+
+@app.after_request
+def add_http_cache_headers(response):
+    """为分析接口的成功响应添加ETag，并压缩、缓存较大的响应体"""
+    version = g.get('data_version')
+    if version is None or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    
+    _set_cache_headers(response, version)
+    encoding = g.get('encoding')
+    if encoding is None or response.direct_passthrough or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+    
+    compressed = compress(body, encoding)
+    compressed_responses.put(version, request.full_path, encoding, compressed, response.mimetype)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 
 @app.route('/')
@@ -46,108 +246,323 @@ def index():
     return render_template('dashboard.html')
 
 
+def _status_payload():
+    """数据加载状态"""
+    data_file = DATA_FILE if os.path.exists(DATA_FILE) else SPOTIFY_DATA_FILE
+    current = g.processor
+    return {
+        'loaded': current is not None,
+        'file_exists': os.path.exists(data_file),
+        'is_netease_data': current.is_netease_data if current else False,
+        'data_file': os.path.basename(data_file) if os.path.exists(data_file) else None,
+        'memory': current.memory_report if current else None,
+        'version': current.snapshot.version if current and current.snapshot else None
+    }
+
+
+def _dataset_metrics(current):
+    """当前数据集的行数和数据表内存（字节），没有数据时为None"""
+    if current is None:
+        return None, None
+    if current.stream_stats is not None:
+        return current.stream_stats.total_rows, None
+    if current.df is None:
+        return None, None
+    
+    if current.memory_report is not None:
+        memory = current.memory_report['total_after']
+    else:
+        memory = int(current.df.memory_usage(index=True, deep=False).sum())
+    return len(current.df), memory
+
+
+@app.route('/metrics')
+def get_metrics():
+    """
+    以Prometheus文本格式输出运行指标
+    
+    gunicorn多进程模式下每个工作进程分别统计，抓取到的是处理该请求的工作进程的数据
+    """
+    current = g.processor
+    rows, memory = _dataset_metrics(current)
+    with _reload_lock:
+        status = dict(reload_status)
+    
+    writer = metrics.MetricsWriter()
+    writer.gauge('data_loaded', '数据是否已加载', [({}, 1 if current is not None else 0)])
+    writer.gauge('dataset_rows', '当前数据集的行数', [({}, rows)])
+    writer.gauge('dataframe_memory_bytes', '数据表占用的内存（字节）', [({}, memory)])
+    stages = current.stage_durations if current is not None else {}
+    writer.gauge('stage_duration_seconds', '当前处理器各阶段最近一次的耗时（秒）',
+                 [({'stage': stage}, round(seconds, 6)) for stage, seconds in sorted(stages.items())])
+    writer.counter('reload_total', '完成的后台重新加载次数', [({}, status['count'])])
+    writer.gauge('reload_running', '是否正在后台重新加载', [({}, 1 if status['running'] else 0)])
+    writer.gauge('last_reload_timestamp_seconds', '最近一次重新加载完成的Unix时间',
+                 [({}, status['finished_at'])])
+    writer.gauge('last_reload_success', '最近一次重新加载是否成功',
+                 [({}, None if status['success'] is None else int(status['success']))])
+    writer.histogram('http_request_duration_seconds', '接口请求耗时（秒）', request_latency,
+                     ('route', 'method', 'status'))
+    return app.response_class(writer.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def _parse_filters():
+    """
+    从请求参数中读取筛选条件
+    
+    music_type、album_type、artist 可以重复出现（满足其中任一取值即可），
+    year_from、year_to 为包含两端的年份范围；不同参数之间同时满足
+    
+    返回:
+        筛选条件字典，没有筛选参数时为空字典
+    异常:
+        ValueError: 年份不是整数
+    """
+    filters = {}
+    for param in CATEGORY_FILTERS:
+        values = [value for value in request.args.getlist(param) if value]
+        if values:
+            filters[param] = values
+    for param in YEAR_FILTERS:
+        value = request.args.get(param)
+        if value:
+            filters[param] = int(value)
+    return filters
+
+
+def _filtered_analyses(current, fields, top_n):
+    """
+    按请求中的筛选参数计算分析结果
+    
+    返回:
+        (分析名称到结果的字典，没有筛选参数时为None；错误响应，没有错误时为None)
+    """
+    try:
+        filters = _parse_filters()
+    except ValueError:
+        return None, (jsonify({'error': '年份必须是整数'}), 400)
+    if not filters:
+        return None, None
+    
+    results = current.get_filtered_analyses(fields, filters, top_n=top_n)
+    if results is None:
+        return None, (jsonify({'error': '当前数据不支持筛选（仅网易云音乐数据，且不能是流式模式）'}), 400)
+    return results, None
+
+
+def _unfiltered_analysis(current, field, top_n):
+    """不筛选时的分析结果：作者排行从作者索引的排名中取前N名，其余直接取快照中的结果"""
+    if field == 'top_artists':
+        return current.get_top_artists(top_n)
+    return current.snapshot.get(field)
+
+
+def _analysis_response(current, field, top_n=None):
+    """返回一项分析的响应：有筛选参数时通过筛选索引计算，否则取预先计算的结果"""
+    filtered, error = _filtered_analyses(current, [field], top_n)
+    if error is not None:
+        return error
+    
+    if filtered is not None:
+        result = filtered[field]
+    else:
+        result = _unfiltered_analysis(current, field, top_n)
+    
+    if result is None:
+        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
+    return jsonify(result)
+
+
 @app.route('/api/status')
 def get_status():
     """获取数据加载状态"""
-    data_file = DATA_FILE if os.path.exists(DATA_FILE) else SPOTIFY_DATA_FILE
-    return jsonify({
-        'loaded': data_loaded,
-        'file_exists': os.path.exists(data_file),
-        'is_netease_data': processor.is_netease_data if processor else False,
-        'data_file': os.path.basename(data_file) if os.path.exists(data_file) else None
-    })
+    return jsonify(_status_payload())
 
 
 @app.route('/api/cluster-stats')
 def get_cluster_stats():
     """获取聚类统计信息"""
-    if not data_loaded or processor is None:
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    stats = processor.get_cluster_stats()
+    stats = current.snapshot.get('cluster_stats')
     return jsonify(stats)
 
 
+@app.route('/api/cluster-k-selection')
+def get_cluster_k_selection():
+    """获取自动选择簇数量的评估曲线"""
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    result = current.snapshot.get('k_selection')
+    if result is None:
+        return jsonify({'error': '未启用自动选择簇数量（设置 N_CLUSTERS=auto）'}), 400
+    
+    return jsonify(result)
+
+
 @app.route('/api/cluster-samples')
 def get_cluster_samples():
     """获取聚类样本"""
-    if not data_loaded or processor is None:
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
     n_samples = request.args.get('n', default=10, type=int)
-    samples = processor.get_sample_tracks(n_samples=n_samples)
+    samples = current.get_sample_tracks(n_samples=n_samples)
     return jsonify(samples)
 
 
+@app.route('/api/cluster/<int:cluster_id>/tracks')
+def get_cluster_tracks(cluster_id):
+    """分页获取某个簇的音乐（最有代表性的在前）"""
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    offset = request.args.get('offset', default=0, type=int)
+    limit = min(request.args.get('limit', default=20, type=int), MAX_PAGE_SIZE)
+    result = current.get_cluster_tracks(cluster_id, offset=offset, limit=limit)
+    if result is None:
+        return jsonify({'error': '簇不存在'}), 404
+    
+    return jsonify(result)
+
+
+@app.route('/api/similar')
+def get_similar_tracks():
+    """获取与某首音乐最相似的音乐"""
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    track = request.args.get('track')
+    if track is None:
+        return jsonify({'error': '缺少track参数'}), 400
+    
+    k = min(request.args.get('k', default=10, type=int), MAX_NEIGHBORS)
+    result = current.get_similar_tracks([track], k=k)
+    if result is None:
+        return jsonify({'error': '不支持此分析（仅Spotify数据）'}), 400
+    if result[0] is None:
+        return jsonify({'error': '音乐不存在'}), 404
+    
+    return jsonify(result[0])
+
+
+@app.route('/api/similar/batch', methods=['POST'])
+def get_similar_tracks_batch():
+    """批量获取相似音乐，请求体为 {"tracks": [...], "k": 10}"""
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    payload = request.get_json(silent=True) or {}
+    tracks = payload.get('tracks')
+    if not isinstance(tracks, list) or not tracks:
+        return jsonify({'error': '缺少tracks列表'}), 400
+    if len(tracks) > MAX_SIMILAR_SEEDS:
+        return jsonify({'error': f'一次最多查询{MAX_SIMILAR_SEEDS}首音乐'}), 400
+    
+    try:
+        k = min(int(payload.get('k', 10)), MAX_NEIGHBORS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'k必须是整数'}), 400
+    
+    result = current.get_similar_tracks(tracks, k=k)
+    if result is None:
+        return jsonify({'error': '不支持此分析（仅Spotify数据）'}), 400
+    
+    return jsonify(result)
+
+
 @app.route('/api/reload')
 def reload_data():
-    """重新加载数据"""
-    success = initialize_processor()
-    return jsonify({'success': success})
+    """在后台重新加载数据，立即返回；进度通过 /api/reload/status 查询"""
+    if worker_count > 1:
+        # 只会重新加载处理该请求的工作进程，进度查询也可能落到其他工作进程上
+        return jsonify({'success': False,
+                        'error': f'当前有{worker_count}个gunicorn工作进程，不支持在线重新加载；'
+                                 '请在数据更新后重启gunicorn（preload模式下HUP不会重新加载主进程中的数据）'}), 409
+    started = start_background_reload()
+    return jsonify({'success': True, 'started': started, 'status': get_reload_status()}), 202
+
+
+@app.route('/api/reload/status')
+def get_reload_progress():
+    """获取后台重新加载的进度"""
+    return jsonify(get_reload_status())
 
 
 @app.route('/api/album-type-analysis')
 def get_album_type_analysis():
-    """获取专辑类型分析"""
-    if not data_loaded or processor is None:
+    """获取专辑类型分析（支持筛选参数）"""
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.get_album_type_analysis()
-    if result is None:
-        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
-    
-    return jsonify(result)
+    return _analysis_response(current, 'album_type_analysis')
 
 
 @app.route('/api/publish-trend')
 def get_publish_trend():
-    """获取音乐发布趋势"""
-    if not data_loaded or processor is None:
+    """获取音乐发布趋势（支持筛选参数）"""
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.get_publish_trend()
-    if result is None:
-        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
-    
-    return jsonify(result)
+    return _analysis_response(current, 'publish_trend')
 
 
 @app.route('/api/music-type-distribution')
 def get_music_type_distribution():
-    """获取音乐类型分布"""
-    if not data_loaded or processor is None:
+    """获取音乐类型分布（支持筛选参数）"""
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.get_music_type_distribution()
-    if result is None:
-        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
-    
-    return jsonify(result)
+    return _analysis_response(current, 'music_type_distribution')
 
 
 @app.route('/api/album-type-top10')
 def get_album_type_top10():
-    """获取专辑类型TOP10"""
-    if not data_loaded or processor is None:
+    """获取专辑类型TOP10（支持筛选参数）"""
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.get_album_type_top10()
-    if result is None:
-        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
-    
-    return jsonify(result)
+    return _analysis_response(current, 'album_type_top10')
 
 
 @app.route('/api/top-artists')
 def get_top_artists():
-    """获取发布作品最多的作者TOP5"""
-    if not data_loaded or processor is None:
+    """获取发布作品最多的作者TOP5（支持筛选参数）"""
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    top_n = min(max(request.args.get('top', default=5, type=int), 0), MAX_PAGE_SIZE)
+    return _analysis_response(current, 'top_artists', top_n=top_n)
+
+
+@app.route('/api/artist/<path:name>')
+def get_artist_detail(name):
+    """获取某位作者的作品数、平均人气、排名和分页的歌曲列表"""
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    top_n = request.args.get('top', default=5, type=int)
-    result = processor.get_top_artists(top_n=top_n)
+    if current.filter_index is None or current.filter_index.artists is None:
+        return jsonify({'error': '不支持此分析（仅网易云音乐数据，且不能是流式模式）'}), 400
+    
+    offset = request.args.get('offset', default=0, type=int)
+    limit = min(request.args.get('limit', default=20, type=int), MAX_PAGE_SIZE)
+    result = current.get_artist_detail(name, offset=offset, limit=limit)
     if result is None:
-        return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
+        return jsonify({'error': '作者不存在'}), 404
     
     return jsonify(result)
 
@@ -155,23 +570,108 @@ def get_top_artists():
 @app.route('/api/wordcloud')
 def get_wordcloud():
     """获取词云图"""
-    if not data_loaded or processor is None:
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.generate_wordcloud()
+    result = current.generate_wordcloud()
     if result is None:
         return jsonify({'error': '生成词云失败'}), 400
     
     return jsonify({'image': result})
 
 
+# 批量接口可选的面板；除status、wordcloud和top_artists（从作者索引取前N名）外都直接取自分析快照
+DASHBOARD_FIELDS = [
+    'status', 'music_type_distribution', 'album_type_analysis', 'album_type_top10',
+    'publish_trend', 'top_artists', 'sentiment_trend', 'wordcloud'
+]
+
+
+def _dashboard_panel(current, field, top_n, filtered):
+    """计算批量接口中的一个面板，失败时返回包含error的字典"""
+    if field == 'status':
+        return _status_payload()
+    if current is None:
+        return {'error': '数据未加载'}
+    
+    if field == 'wordcloud':
+        result = current.generate_wordcloud()
+        return {'image': result} if result is not None else {'error': '生成词云失败'}
+    
+    if filtered is not None and field in filtered:
+        result = filtered[field]
+    else:
+        result = _unfiltered_analysis(current, field, top_n)
+    if result is None:
+        return {'error': '不支持此分析（仅网易云音乐数据）'}
+    return result
+
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    """
+    一次返回多个看板面板的数据
+    
+    参数 fields 为逗号分隔的面板名称，默认返回除词云图外的全部面板；
+    top 为作者排行的数量；筛选参数同各分析接口，作用于可筛选的面板
+    """
+    fields_arg = request.args.get('fields')
+    if fields_arg:
+        fields = [f.strip() for f in fields_arg.split(',') if f.strip()]
+    else:
+        fields = [f for f in DASHBOARD_FIELDS if f != 'wordcloud']
+    
+    unknown = [f for f in fields if f not in DASHBOARD_FIELDS]
+    if unknown:
+        return jsonify({'error': f"未知的面板: {', '.join(unknown)}", 'fields': DASHBOARD_FIELDS}), 400
+    
+    current = g.processor
+    top_n = min(max(request.args.get('top', default=5, type=int), 0), MAX_PAGE_SIZE)
+    filtered = None
+    if current is not None:
+        filtered, error = _filtered_analyses(current, [f for f in fields if f in FILTERABLE_ANALYSES], top_n)
+        if error is not None:
+            return error
+    return jsonify({field: _dashboard_panel(current, field, top_n, filtered) for field in fields})
+
+
+@app.route('/api/wordcloud.png')
+def get_wordcloud_png():
+    """
+    获取词云图PNG
+    
+    每个数据版本下同样尺寸的图片只渲染一次；渲染失败时返回词频数据
+    """
+    current = g.processor
+    if current is None:
+        return jsonify({'error': '数据未加载'}), 400
+    
+    width = min(max(request.args.get('width', default=800, type=int), 100), 2000)
+    height = min(max(request.args.get('height', default=400, type=int), 100), 2000)
+    max_words = min(max(request.args.get('max_words', default=100, type=int), 10), 500)
+    
+    try:
+        png = current.render_wordcloud_png(width=width, height=height, max_words=max_words)
+    except Exception as e:
+        print(f"生成词云失败: {e}")
+        word_freq = current.get_word_frequencies() or {}
+        return jsonify({'error': '生成词云失败', 'word_freq': dict(list(word_freq.items())[:50])}), 500
+    
+    if png is None:
+        return jsonify({'error': '生成词云失败'}), 400
+    
+    return app.response_class(png, mimetype='image/png')
+
+
 @app.route('/api/sentiment-trend')
 def get_sentiment_trend():
     """获取情感趋势分析"""
-    if not data_loaded or processor is None:
+    current = g.processor
+    if current is None:
         return jsonify({'error': '数据未加载'}), 400
     
-    result = processor.get_sentiment_trend()
+    result = current.snapshot.get('sentiment_trend')
     if result is None:
         return jsonify({'error': '不支持此分析（仅网易云音乐数据）'}), 400
     
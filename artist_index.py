@@ -0,0 +1,165 @@
+"""
+作者倒排索引
+合作歌曲的多位作者在artist_name中以 ", " 连接（见 NetEaseMusicScraper.parse_track_info），
+这里把每首歌计入其中每一位作者名下，并预先计算每位作者的作品数、人气总和与排名
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# artist_name中多位作者之间的分隔符
+ARTIST_SEPARATOR = ', '
+
+
+def split_artists(credit):
+    """
+    把作者字段拆分为作者列表
+
+    参数:
+        credit: artist_name的值，如 '周杰伦, 费玉清'
+    返回:
+        去掉空白和重复后的作者列表
+    """
+    names = []
+    for name in str(credit).split(ARTIST_SEPARATOR):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class ArtistIndex:
+    """
+    作者 -> 歌曲行号 的倒排索引
+
+    不同的作者字段（如 'A'、'A, B'）通常远少于行数，拆分只对每个不同的字段做一次；
+    每行通过字段编码找到它的作者
+    """
+
+    def __init__(self, values, popularity=None):
+        """
+        参数:
+            values: artist_name列（Series）
+            popularity: 人气列（Series），为None时不统计平均人气
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            credit_codes = values.cat.codes.to_numpy()
+            credits = list(values.cat.categories)
+        else:
+            credit_codes, uniques = pd.factorize(values)
+            credits = list(uniques)
+
+        artist_lists = [split_artists(credit) for credit in credits]
+        self.categories = sorted({name for names in artist_lists for name in names})
+        self.code_of = {name: code for code, name in enumerate(self.categories)}
+        n_artists = len(self.categories)
+
+        # 每个作者字段对应的作者编码：credit_artists[credit_ptr[i]:credit_ptr[i + 1]]
+        lengths = np.array([len(names) for names in artist_lists], dtype=np.int64)
+        self.credit_codes = credit_codes  # 每行的作者字段编码，缺失值为-1
+        self.credit_ptr = np.concatenate([[0], np.cumsum(lengths)])
+        self.credit_artists = np.array([self.code_of[name] for names in artist_lists for name in names],
+                                       dtype=np.int64)
+        self.credit_owner = np.repeat(np.arange(len(credits)), lengths)
+
+        # 把每行展开为 (行号, 作者) 对，按作者稳定排序后得到每位作者递增的行号
+        rows = np.flatnonzero(credit_codes >= 0)
+        row_credits = credit_codes[rows]
+        per_row = lengths[row_credits]
+        exploded_rows = np.repeat(rows, per_row)
+        entry_starts = np.repeat(self.credit_ptr[row_credits] - (np.cumsum(per_row) - per_row), per_row)
+        exploded_artists = self.credit_artists[entry_starts + np.arange(len(exploded_rows))]
+        order = np.argsort(exploded_artists, kind='stable')
+        row_dtype = np.int32 if len(values) < 2 ** 31 else np.int64
+        self.rows = exploded_rows[order].astype(row_dtype)
+        self.offsets = np.searchsorted(exploded_artists[order], np.arange(n_artists + 1), side='left')
+
+        # 每位作者的作品数和人气，以及按作品数降序的排名（数量相同时按名称）
+        self.track_counts = np.diff(self.offsets)
+        self.pop_sum = self.pop_n = None
+        if popularity is not None:
+            popularity = popularity.to_numpy(dtype=np.float64)
+            valid = ~np.isnan(popularity)
+            self.pop_sum = self.counts(None, np.where(valid, popularity, 0.0))
+            self.pop_n = self.counts(None, valid)
+        self.ranked = np.argsort(-self.track_counts, kind='stable')
+        self.rank_of = np.empty(n_artists, dtype=np.int64)
+        self.rank_of[self.ranked] = np.arange(n_artists)
+
+    def lookup_codes(self, values):
+        """把作者名列表转为编码数组，不存在的作者忽略"""
+        return np.array([self.code_of[v] for v in values if v in self.code_of], dtype=np.int64)
+
+    def size(self, codes):
+        """这些作者的作品数之和（合作歌曲可能重复计算，只用于估计）"""
+        return int(self.track_counts[codes].sum())
+
+    def select(self, codes):
+        """这些作者的全部歌曲行号"""
+        parts = [self.rows[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+        if not parts:
+            return self.rows[:0]
+        # 多位作者合作的歌曲会出现在每位作者名下，需要去重
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def mask(self, rows, codes):
+        """rows中作者包含codes中任一作者的行"""
+        wanted = np.zeros(len(self.categories), dtype=bool)
+        wanted[codes] = True
+        credit_has = np.zeros(len(self.credit_ptr), dtype=bool)  # 最后一位对应缺失值（编码-1）
+        hits = self.credit_owner[wanted[self.credit_artists]]
+        credit_has[hits] = True
+        return credit_has[self.credit_codes[rows]]
+
+    def counts(self, rows, weights=None):
+        """
+        按作者统计行数或权重之和
+
+        先按作者字段聚合（与选中行数成正比），再分配到字段中的每位作者
+
+        参数:
+            rows: 行号数组，为None时统计全部行
+            weights: 与整列对齐的权重数组，为None时统计行数
+        返回:
+            每位作者的统计值数组
+        """
+        codes = self.credit_codes if rows is None else self.credit_codes[rows]
+        valid = codes >= 0
+        if weights is not None:
+            weights = (weights if rows is None else weights[rows])[valid]
+        per_credit = np.bincount(codes[valid], weights=weights, minlength=len(self.credit_ptr) - 1)
+        return np.bincount(self.credit_artists, weights=per_credit[self.credit_owner],
+                           minlength=len(self.categories))
+
+    def _record(self, code):
+        pop_n = self.pop_n[code] if self.pop_n is not None else 0
+        return {
+            'artist': self.categories[code],
+            'count': int(self.track_counts[code]),
+            'avg_popularity': float(self.pop_sum[code] / pop_n) if pop_n else float('nan'),
+        }
+
+    def top_artists(self, top_n=None):
+        """
+        作品数量最多的前N名作者
+
+        参数:
+            top_n: 返回的数量，为None时返回全部
+        """
+        ranked = self.ranked if top_n is None else self.ranked[:top_n]
+        return [self._record(code) for code in ranked]
+
+    def artist_detail(self, name):
+        """
+        某位作者的统计信息和歌曲行号
+
+        返回:
+            (统计信息字典, 递增的行号数组)，作者不存在时返回None
+        """
+        code = self.code_of.get(name)
+        if code is None:
+            return None
+        record = self._record(code)
+        record['rank'] = int(self.rank_of[code]) + 1
+        return record, self.rows[self.offsets[code]:self.offsets[code + 1]]
@@ -0,0 +1,338 @@
+"""
+性能基准测试
+按不同规模生成示例数据，测量数据处理各阶段和各接口的耗时与峰值内存，
+结果写入JSON文件，便于在不同提交之间比较
+
+运行方式:
+    python benchmark.py --scales 10k,100k
+    python benchmark.py --scales 1M,10M --datasets spotify --engine minibatch
+    python benchmark.py --compare benchmark_results/旧结果.json benchmark_results/新结果.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不记录峰值内存
+    resource = None
+
+
+# 默认测量的数据规模
+DEFAULT_SCALES = '10k,100k'
+
+# 每种数据测量的接口，(方法, URL, JSON请求体)
+NETEASE_ROUTES = [
+    ('GET', '/api/status', None),
+    ('GET', '/api/dashboard', None),
+    ('GET', '/api/music-type-distribution', None),
+    ('GET', '/api/album-type-analysis', None),
+    ('GET', '/api/album-type-top10', None),
+    ('GET', '/api/publish-trend', None),
+    ('GET', '/api/top-artists?top=5', None),
+    ('GET', '/api/sentiment-trend', None),
+    ('GET', '/api/wordcloud.png', None),
+    ('GET', '/api/wordcloud', None),
+]
+SPOTIFY_ROUTES = [
+    ('GET', '/api/status', None),
+    ('GET', '/api/cluster-stats', None),
+    ('GET', '/api/cluster-samples?n=10', None),
+    ('GET', '/api/cluster/0/tracks?offset=0&limit=100', None),
+    ('GET', '/api/similar?track=0&k=10', None),
+    ('POST', '/api/similar/batch', {'tracks': list(range(100)), 'k': 10}),
+]
+
+
+def parse_scale(text):
+    """把 '10k'、'1M' 这样的规模转换为行数"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in ('k', 'm') else text
+    return int(float(number) * multiplier)
+
+
+def _peak_rss_bytes():
+    """当前进程的峰值常驻内存（字节），无法获取时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def prepare_dataset(dataset, n_rows, data_dir):
+    """
+    生成（或复用已生成的）示例数据文件
+
+    参数:
+        dataset: 'spotify' 或 'netease'
+        n_rows: 行数
+        data_dir: 数据文件目录
+    返回:
+        (CSV文件路径, 生成耗时；复用已有文件时为None)
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'{dataset}_{n_rows}.csv')
+    if os.path.exists(path):
+        return path, None
+
+    # 生成器会打印数据预览，这里不需要
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if dataset == 'spotify':
+            from generate_sample_data import generate_sample_data
+            generate_sample_data(n_samples=n_rows, output_file=path)
+        else:
+            from netease_scraper import generate_sample_netease_data
+            generate_sample_netease_data(n_samples=n_rows, output_file=path)
+    return path, time.perf_counter() - started
+
+
+def clear_caches(path):
+    """删除数据文件的列式缓存、模型和歌名分词缓存，使下一次运行从CSV开始"""
+    from data_cache import ColumnarCache
+    from data_processor import TOKEN_CACHE_FILE
+
+    shutil.rmtree(ColumnarCache.cache_dir_for(path), ignore_errors=True)
+    token_cache = os.path.join(os.path.dirname(os.path.abspath(path)), TOKEN_CACHE_FILE)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(token_cache + suffix):
+            os.remove(token_cache + suffix)
+
+
+def _time_route(client, method, url, body, repeat):
+    """
+    测量一个接口的耗时
+
+    第一次请求单独记录（包括按需计算和压缩），之后重复请求命中各级缓存
+    """
+    headers = {'Accept-Encoding': 'gzip'}
+    timings = []
+    status = None
+    size = None
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        response = client.open(url, method=method, json=body, headers=headers)
+        timings.append(time.perf_counter() - started)
+        status = response.status_code
+        size = len(response.get_data())
+
+    repeated = sorted(timings[1:])
+    return {
+        'status': status,
+        'bytes': size,
+        'first_ms': round(timings[0] * 1000, 3),
+        'median_ms': round(statistics.median(repeated) * 1000, 3) if repeated else None,
+        'p95_ms': round(repeated[min(int(len(repeated) * 0.95), len(repeated) - 1)] * 1000, 3) if repeated else None,
+    }
+
+
+def run_case(dataset, path, mode, options):
+    """
+    在独立进程中运行一次完整的处理流程和全部接口
+
+    参数:
+        dataset: 'spotify' 或 'netease'
+        path: 数据文件路径
+        mode: 'cold'（清除缓存后从CSV开始）或 'warm'（使用上一次生成的缓存）
+        options: 处理器参数和接口重复次数
+    返回:
+        结果字典
+    """
+    rss_start = _peak_rss_bytes()
+    import app as application
+    from data_processor import MusicDataProcessor
+
+    processor = MusicDataProcessor(n_clusters=options['n_clusters'], streaming=options['streaming'],
+                                   cluster_engine=options['engine'])
+
+    # 每个阶段结束时记录一次峰值内存，峰值上升的阶段就是内存占用最高的阶段
+    stage_peak_rss = {}
+    enter_stage = processor._enter_stage
+
+    def enter_stage_tracking(stage):
+        previous = processor.stage
+        enter_stage(stage)
+        if previous not in (None, 'done'):
+            stage_peak_rss[previous] = _peak_rss_bytes()
+
+    processor._enter_stage = enter_stage_tracking
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        success = processor.process_pipeline(path)
+    pipeline_seconds = time.perf_counter() - started
+    if not success:
+        return {'dataset': dataset, 'mode': mode, 'error': 'process_pipeline失败'}
+
+    application.processor = processor
+    application.data_loaded = True
+    client = application.app.test_client()
+    routes = NETEASE_ROUTES if processor.is_netease_data else SPOTIFY_ROUTES
+    route_results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for method, url, body in routes:
+            route_results[f'{method} {url}'] = _time_route(client, method, url, body, options['repeat'])
+
+    memory_report = processor.memory_report or {}
+    return {
+        'dataset': dataset,
+        'mode': mode,
+        'pipeline_seconds': round(pipeline_seconds, 6),
+        # 包括接口首次请求时才执行的分词和词云渲染
+        'stages': {stage: round(seconds, 6) for stage, seconds in processor.stage_durations.items()},
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'start_rss_bytes': rss_start,
+        'stage_peak_rss_bytes': stage_peak_rss,
+        'dataframe_bytes': memory_report.get('total_after'),
+        'routes': route_results,
+    }
+
+
+def _git_commit():
+    """当前提交的哈希，不在git仓库中时返回None"""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return output.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    """记录影响结果的运行环境"""
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'pandas': pandas.__version__,
+        'scikit-learn': sklearn.__version__,
+    }
+
+
+def run_benchmarks(args):
+    """按数据类型、规模和冷/热启动逐个运行，返回完整结果"""
+    n_clusters = args.n_clusters if args.n_clusters == 'auto' else int(args.n_clusters)
+    options = {'n_clusters': n_clusters, 'engine': args.engine, 'streaming': args.streaming,
+               'repeat': args.repeat}
+    results = {
+        'commit': _git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'options': options,
+        'runs': [],
+    }
+
+    # 每次运行使用新的进程，峰值内存互不影响
+    context = multiprocessing.get_context('spawn')
+    for dataset in args.datasets.split(','):
+        for scale in args.scales.split(','):
+            n_rows = parse_scale(scale)
+            print(f"准备数据: {dataset} {n_rows} 行")
+            path, generate_seconds = prepare_dataset(dataset, n_rows, args.data_dir)
+            clear_caches(path)
+
+            for mode in ('cold', 'warm'):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    run = executor.submit(run_case, dataset, path, mode, options).result()
+                run['rows'] = n_rows
+                run['generate_seconds'] = round(generate_seconds, 3) if generate_seconds else None
+                results['runs'].append(run)
+                if 'error' in run:
+                    print(f"  {mode}: {run['error']}")
+                else:
+                    peak = run['peak_rss_bytes']
+                    peak_text = f"，峰值内存 {peak / 1e6:.0f} MB" if peak else ''
+                    print(f"  {mode}: 处理流程 {run['pipeline_seconds']:.3f} 秒{peak_text}")
+    return results
+
+
+def _flatten(results):
+    """把结果展开为 {(数据, 行数, 模式, 指标): 数值}"""
+    values = {}
+    for run in results['runs']:
+        if 'error' in run:
+            continue
+        key = (run['dataset'], run['rows'], run['mode'])
+        values[key + ('pipeline_seconds',)] = run['pipeline_seconds']
+        values[key + ('peak_rss_mb',)] = run['peak_rss_bytes'] / 1e6 if run['peak_rss_bytes'] else None
+        for stage, seconds in run['stages'].items():
+            values[key + (f'stage:{stage}',)] = seconds
+        for route, timing in run['routes'].items():
+            values[key + (f'{route} first_ms',)] = timing['first_ms']
+            values[key + (f'{route} median_ms',)] = timing['median_ms']
+    return values
+
+
+def compare_results(old_file, new_file):
+    """打印两次结果中相同指标的对比，比值大于1表示变慢（或内存增加）"""
+    with open(old_file, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_file, encoding='utf-8') as f:
+        new = json.load(f)
+
+    old_values = _flatten(old)
+    new_values = _flatten(new)
+    print(f"旧: {old.get('commit')} ({old.get('created_at')})")
+    print(f"新: {new.get('commit')} ({new.get('created_at')})")
+    print(f"{'数据':<8} {'行数':>9} {'模式':<5} {'指标':<55} {'旧':>10} {'新':>10} {'比值':>7}")
+    for key in sorted(set(old_values) & set(new_values)):
+        before, after = old_values[key], new_values[key]
+        if before is None or after is None:
+            continue
+        ratio = f'{after / before:.2f}' if before else '-'
+        dataset, rows, mode, metric = key
+        print(f"{dataset:<8} {rows:>9} {mode:<5} {metric:<55} {before:>10.3f} {after:>10.3f} {ratio:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='音乐数据分析系统性能基准测试')
+    parser.add_argument('--scales', default=DEFAULT_SCALES,
+                        help='逗号分隔的数据规模，如 10k,100k,1M,10M（默认: %(default)s）')
+    parser.add_argument('--datasets', default='spotify,netease', help='逗号分隔的数据类型（默认: %(default)s）')
+    parser.add_argument('--engine', default='kmeans', choices=['kmeans', 'minibatch'], help='聚类引擎')
+    parser.add_argument('--n-clusters', default='5', help="簇数量，或 'auto'")
+    parser.add_argument('--streaming', action='store_true', help='以流式模式加载网易云音乐数据')
+    parser.add_argument('--repeat', type=int, default=20, help='每个接口在首次请求后的重复次数')
+    parser.add_argument('--data-dir', default='benchmark_data', help='生成的数据文件目录，已存在的文件会复用')
+    parser.add_argument('--output', default=None, help='结果文件路径，默认为 benchmark_results/<时间>-<提交>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='对比两个结果文件')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    results = run_benchmarks(args)
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join('benchmark_results', f"{stamp}-{results['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+CSV数据的列式磁盘缓存
+首次加载时把每一列写成 .npy 文件，之后直接内存映射读取，避免重复解析CSV
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# 缓存格式版本，格式变化时递增以使旧缓存失效
+CACHE_FORMAT_VERSION = 2
+
+
+def file_hash(filepath, chunk_size=1 << 20):
+    """
+    计算文件内容的SHA1哈希
+
+    参数:
+        filepath: 文件路径
+        chunk_size: 每次读取的字节数
+    返回:
+        十六进制哈希字符串
+    """
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+class ColumnarCache:
+    """以源文件大小、修改时间和内容哈希为键的按列缓存"""
+
+    def __init__(self, filepath, cache_dir=None):
+        """
+        参数:
+            filepath: 源CSV文件路径
+            cache_dir: 缓存目录，默认为CSV旁边的 <文件名>.cache 目录
+        """
+        self.filepath = filepath
+        self.cache_dir = cache_dir or self.cache_dir_for(filepath)
+        self.meta_path = os.path.join(self.cache_dir, 'meta.json')
+        self.source_hash = None
+        self.extra = {}  # 随缓存保存的附加信息
+
+    @staticmethod
+    def cache_dir_for(filepath):
+        """源文件对应的默认缓存目录"""
+        return f'{filepath}.cache'
+
+    def _read_meta(self):
+        """读取缓存元数据，不存在或损坏时返回None"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format_version') != CACHE_FORMAT_VERSION:
+            return None
+        return meta
+
+    def _write_meta(self, meta):
+        """原子地写入缓存元数据"""
+        tmp_path = f'{self.meta_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+
+    def is_valid(self):
+        """
+        检查缓存是否与当前源文件一致
+
+        大小和修改时间都相同时直接认为有效；仅修改时间变化时
+        再比较内容哈希，内容未变则更新元数据并继续使用缓存
+        """
+        meta = self._read_meta()
+        if meta is None:
+            return False
+
+        stat = os.stat(self.filepath)
+        if meta['size'] != stat.st_size:
+            return False
+
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            if file_hash(self.filepath) != meta['sha1']:
+                return False
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(meta)
+
+        self.source_hash = meta['sha1']
+        self.extra = meta.get('extra', {})
+        return True
+
+    def _column_path(self, index, suffix):
+        return os.path.join(self.cache_dir, f'col{index}.{suffix}')
+
+    def save(self, df, extra=None):
+        """
+        将DataFrame按列写入缓存
+
+        数值列直接保存为 .npy；分类列保存其整数编码和类别表；
+        其余列先做字典编码再按同样方式保存，读取时还原为字符串
+
+        参数:
+            df: 从源CSV解析出的DataFrame
+            extra: 随缓存保存的附加信息（需可JSON序列化）
+        返回:
+            写入成功返回True，否则返回False
+        """
+        try:
+            stat = os.stat(self.filepath)
+            source_hash = file_hash(self.filepath)
+
+            # 先删除旧缓存，保证元数据只在所有列写完后出现
+            if os.path.isdir(self.cache_dir):
+                shutil.rmtree(self.cache_dir)
+            os.makedirs(self.cache_dir)
+
+            columns = []
+            for index, name in enumerate(df.columns):
+                series = df[name]
+                if series.dtype.kind in 'biuf':
+                    np.save(self._column_path(index, 'npy'), series.to_numpy())
+                    columns.append({'name': name, 'kind': 'numeric'})
+                elif isinstance(series.dtype, pd.CategoricalDtype):
+                    np.save(self._column_path(index, 'codes.npy'), series.cat.codes.to_numpy())
+                    with open(self._column_path(index, 'json'), 'w', encoding='utf-8') as f:
+                        json.dump([str(v) for v in series.cat.categories], f, ensure_ascii=False)
+                    columns.append({'name': name, 'kind': 'categorical'})
+                else:
+                    codes, uniques = pd.factorize(series.astype(object))
+                    np.save(self._column_path(index, 'codes.npy'), codes.astype(np.int32))
+                    with open(self._column_path(index, 'json'), 'w', encoding='utf-8') as f:
+                        json.dump([str(v) for v in uniques], f, ensure_ascii=False)
+                    columns.append({'name': name, 'kind': 'string'})
+
+            self._write_meta({
+                'format_version': CACHE_FORMAT_VERSION,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha1': source_hash,
+                'rows': int(len(df)),
+                'columns': columns,
+                'extra': extra or {},
+            })
+            self.source_hash = source_hash
+            self.extra = extra or {}
+            print(f"已写入列式缓存: {self.cache_dir}")
+            return True
+        except Exception as e:
+            print(f"写入列式缓存失败: {e}")
+            return False
+
+    def load(self, mmap=True):
+        """
+        从缓存读取DataFrame
+
+        参数:
+            mmap: 是否以只读内存映射方式打开数值列和分类编码
+        返回:
+            DataFrame
+        """
+        meta = self._read_meta()
+        mmap_mode = 'r' if mmap else None
+
+        data = {}
+        for index, column in enumerate(meta['columns']):
+            if column['kind'] == 'numeric':
+                data[column['name']] = np.load(self._column_path(index, 'npy'), mmap_mode=mmap_mode)
+            elif column['kind'] == 'categorical':
+                codes = np.load(self._column_path(index, 'codes.npy'), mmap_mode=mmap_mode)
+                with open(self._column_path(index, 'json'), 'r', encoding='utf-8') as f:
+                    categories = json.load(f)
+                data[column['name']] = pd.Categorical.from_codes(codes, categories)
+            else:
+                codes = np.load(self._column_path(index, 'codes.npy'))
+                with open(self._column_path(index, 'json'), 'r', encoding='utf-8') as f:
+                    categories = json.load(f)
+                values = np.empty(len(categories) + 1, dtype=object)
+                values[:-1] = categories
+                values[-1] = np.nan  # 编码-1表示缺失值
+                data[column['name']] = values[codes]
+
+        return pd.DataFrame(data, copy=False)
@@ -1,31 +1,180 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from sklearn.neighbors import KDTree
+import joblib
+from joblib import Parallel, delayed
 import json
-from collections import Counter
 from datetime import datetime
-import jieba
 from wordcloud import WordCloud
-import matplotlib
-matplotlib.use('Agg')  # 使用非交互式后端
-import matplotlib.pyplot as plt
 import io
 import base64
+import hashlib
 import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from data_cache import ColumnarCache
+from filter_index import FilterIndex
+from stream_aggregator import NetEaseStreamAggregator
+from title_tokenizer import TitleTokenizer
+
+
+# CSV中已知列的显式类型，避免pandas逐列推断
+CSV_DTYPES = {
+    'song_id': 'int64',
+    'song_name': str,
+    'artist_name': str,
+    'album_name': str,
+    'album_type': str,
+    'music_type': str,
+    'publish_date': str,
+    'publish_year': 'int64',
+    'duration_ms': 'int64',
+    'popularity': 'int64',
+    'name': str,
+    'artists': str,
+    'danceability': 'float64',
+    'energy': 'float64',
+    'valence': 'float64',
+    'acousticness': 'float64',
+    'instrumentalness': 'float64',
+    'liveness': 'float64',
+    'speechiness': 'float64',
+}
+
+# 按Parquet格式读取的文件扩展名（需要安装pyarrow）
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+# 模型缓存格式版本，格式变化时递增以使旧模型失效
+MODEL_FORMAT_VERSION = 1
+
+# 歌名分词缓存的文件名
+TOKEN_CACHE_FILE = 'title_tokens.sqlite'
+
+# 词云图PNG缓存的总字节数上限
+WORDCLOUD_CACHE_BYTES = 16 * 1024 * 1024
+
+# 相似音乐查询中用作音乐标识的列，不存在时使用行号
+TRACK_ID_COLUMN = 'track_id'
+
+# 可以按筛选条件计算的看板分析
+FILTERABLE_ANALYSES = ('album_type_analysis', 'album_type_top10', 'music_type_distribution',
+                       'publish_trend', 'top_artists')
+
+# 作者详情中每首歌返回的列
+NETEASE_TRACK_COLUMNS = ('song_id', 'song_name', 'artist_name', 'album_name', 'album_type',
+                         'music_type', 'publish_date', 'popularity')
+
+# 取值高度重复的文本列，加载后转为字典编码的分类类型
+CATEGORICAL_COLUMNS = ['album_type', 'music_type', 'artist_name', 'album_name']
+
+
+def _evaluate_k(features, k, engine_params, sample_size):
+    """
+    拟合一个候选簇数量并计算其评估指标（在并行工作进程中运行）
+    
+    返回:
+        (评估结果字典, 拟合好的聚类模型)
+    """
+    candidate = MusicDataProcessor(n_clusters=k, use_cache=False, **engine_params)
+    start = time.perf_counter()
+    labels = candidate._fit_labels(features)
+    fit_time = time.perf_counter() - start
+    
+    try:
+        silhouette = float(silhouette_score(features, labels, random_state=42,
+                                            sample_size=min(sample_size, len(features))))
+    except ValueError:
+        # 子样本中只出现了一个簇
+        silhouette = float('nan')
+    
+    result = {
+        'k': int(k),
+        'inertia': candidate._inertia(features, labels),
+        'silhouette': silhouette,
+        'fit_time': fit_time,
+    }
+    return result, candidate.kmeans
+
+
+class AnalyticsSnapshot:
+    """某一数据版本的全部看板分析结果，构建后只读"""
+    
+    def __init__(self, version, results):
+        """
+        参数:
+            version: 数据版本标识
+            results: 分析名称到结果的映射
+        """
+        self._version = version
+        self._created_at = datetime.now().isoformat(timespec='seconds')
+        # 列表结果转为元组，防止被请求处理代码意外修改
+        self._results = MappingProxyType({
+            name: tuple(value) if isinstance(value, list) else value
+            for name, value in results.items()
+        })
+    
+    @property
+    def version(self):
+        return self._version
+    
+    @property
+    def created_at(self):
+        return self._created_at
+    
+    def get(self, name):
+        """获取某项分析结果，不支持的分析返回None"""
+        return self._results.get(name)
 
 
 class MusicDataProcessor:
     """处理音乐数据的类，包括特征提取、标准化和聚类"""
     
-    def __init__(self, n_clusters=5):
+    def __init__(self, n_clusters=5, use_cache=True, streaming=False, chunksize=100000,
+                 cluster_engine='kmeans', batch_size=4096, minibatch_epochs=3,
+                 k_range=(2, 10), silhouette_sample_size=10000, n_jobs=-1):
         """
         初始化音乐数据处理器
         
         参数:
-            n_clusters: K-Means聚类的簇数量
+            n_clusters: K-Means聚类的簇数量，为'auto'时在k_range范围内自动选择
+            use_cache: 是否使用CSV旁边的列式缓存加速加载
+            streaming: 是否以流式模式分块读取网易云音乐数据（不保留完整数据表）
+            chunksize: 流式模式下每块的行数，也用于分块分配簇标签
+            cluster_engine: 聚类引擎，'kmeans'为精确的全量K-Means，
+                'minibatch'为近似的小批量K-Means
+            batch_size: 小批量K-Means每次partial_fit的样本数
+            minibatch_epochs: 小批量K-Means遍历全部数据的轮数
+            k_range: 自动选择簇数量时的候选范围（含两端）
+            silhouette_sample_size: 计算轮廓系数时的子样本大小
+            n_jobs: 并行评估候选簇数量的进程数，-1表示使用全部CPU核心
         """
-        self.n_clusters = n_clusters
+        if cluster_engine not in ('kmeans', 'minibatch'):
+            raise ValueError(f"未知的聚类引擎: {cluster_engine}")
+        
+        self.auto_k = n_clusters == 'auto'
+        self.n_clusters = None if self.auto_k else n_clusters
+        self.k_range = k_range
+        self.silhouette_sample_size = silhouette_sample_size
+        self.n_jobs = n_jobs
+        self.k_selection = None  # 自动选择簇数量时每个候选k的评估结果
+        self.cluster_order = None  # 按 (簇, 到质心距离) 排序的行位置
+        self.cluster_distances = None  # 与cluster_order对应的到质心距离
+        self.cluster_offsets = None  # 每个簇在cluster_order中的起止位置
+        self.cluster_feature_means = None  # 每个簇的特征均值
+        self.neighbor_index = None  # 标准化特征空间上的KD树
+        self.track_lookup = None  # 音乐标识到行位置的映射
+        self.use_cache = use_cache
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.cluster_engine = cluster_engine
+        self.batch_size = batch_size
+        self.minibatch_epochs = minibatch_epochs
         self.scaler = StandardScaler()
         self.kmeans = None
         self.feature_columns = [
@@ -35,17 +184,54 @@ class MusicDataProcessor:
         self.df = None
         self.scaled_features = None
         self.is_netease_data = False  # 标识是否为网易云音乐数据
+        self.source_path = None  # 数据文件路径
+        self.source_hash = None  # 数据文件内容哈希（使用缓存时可用）
+        self.stream_stats = None  # 流式模式下的增量统计结果
+        self.memory_report = None  # 数据表压缩前后每列占用的字节数
+        self.snapshot = None  # 当前数据版本的分析结果快照
+        self.filter_index = None  # 网易云音乐数据按类型、作者、年份筛选的倒排索引
+        self.stage = None  # process_pipeline当前所处的阶段
+        self.stage_durations = {}  # 各阶段耗时（秒），包括按需执行的分词和词云渲染
+        self._stage_started = None
+        self._word_freq = None  # 歌曲名称词频
+        self._wordcloud_cache = OrderedDict()  # (宽, 高, 最大词数) -> PNG字节
+        self._wordcloud_lock = threading.Lock()
         
+    def _read_csv(self, filepath):
+        """按已知列类型解析CSV，类型不符时退回自动推断；Parquet文件（需要pyarrow）直接读取"""
+        if filepath.lower().endswith(PARQUET_EXTENSIONS):
+            return pd.read_parquet(filepath)
+        try:
+            return pd.read_csv(filepath, encoding='utf-8-sig', dtype=CSV_DTYPES)
+        except (ValueError, TypeError):
+            # 列中存在缺失值或非数字内容
+            return pd.read_csv(filepath, encoding='utf-8-sig')
+    
     def load_data(self, filepath):
         """
         加载Spotify数据集或网易云音乐数据集
         
+        首次加载时会压缩数据表并在CSV旁写入列式缓存，之后源文件未变化时
+        直接从缓存内存映射读取；源文件变化后缓存自动重建
+        
         参数:
             filepath: CSV文件路径
         """
         try:
-            self.df = pd.read_csv(filepath, encoding='utf-8-sig')
-            print(f"成功加载数据: {len(self.df)} 条记录")
+            self.source_path = filepath
+            cache = ColumnarCache(filepath) if self.use_cache else None
+            if cache is not None and cache.is_valid():
+                self.df = cache.load()
+                self.memory_report = cache.extra.get('memory_report')
+                print(f"从列式缓存加载数据: {len(self.df)} 条记录")
+            else:
+                self.df = self._read_csv(filepath)
+                print(f"成功加载数据: {len(self.df)} 条记录")
+                self.compact_dataframe()
+                if cache is not None:
+                    cache.save(self.df, extra={'memory_report': self.memory_report})
+            self.source_hash = cache.source_hash if cache is not None else None
+            self.stream_stats = None
             
             # 检测数据类型
             if 'song_name' in self.df.columns or 'music_type' in self.df.columns:
@@ -60,6 +246,88 @@ class MusicDataProcessor:
             print(f"加载数据失败: {e}")
             return False
     
+    @staticmethod
+    def _column_memory(df):
+        """返回每列占用的字节数"""
+        usage = df.memory_usage(index=False, deep=True)
+        return {col: int(nbytes) for col, nbytes in usage.items()}
+    
+    def compact_dataframe(self):
+        """
+        压缩数据表的内存占用
+        
+        重复度高的文本列转为分类类型（整数编码+类别表），
+        整数列降到能容纳其取值的最小位宽，并记录压缩前后的内存报告
+        """
+        if self.df is None:
+            return None
+        
+        before = self._column_memory(self.df)
+        
+        for col in CATEGORICAL_COLUMNS:
+            if col in self.df.columns and self.df[col].dtype == object:
+                self.df[col] = self.df[col].astype('category')
+        
+        for col in self.df.columns:
+            if self.df[col].dtype.kind in 'iu':
+                self.df[col] = pd.to_numeric(self.df[col], downcast='integer')
+        
+        after = self._column_memory(self.df)
+        self.memory_report = {
+            'before': before,
+            'after': after,
+            'total_before': sum(before.values()),
+            'total_after': sum(after.values()),
+        }
+        print(f"数据表内存: {self.memory_report['total_before'] / 1e6:.1f} MB -> "
+              f"{self.memory_report['total_after'] / 1e6:.1f} MB")
+        return self.memory_report
+    
+    def load_data_streaming(self, filepath):
+        """
+        分块读取网易云音乐数据并增量统计，不保留完整数据表
+        
+        Spotify数据需要完整特征矩阵进行聚类，会退回到普通加载
+        
+        参数:
+            filepath: CSV文件路径
+        """
+        try:
+            self.source_path = filepath
+            if filepath.lower().endswith(PARQUET_EXTENSIONS):
+                print("流式模式仅支持CSV文件，改为完整加载")
+                return self.load_data(filepath)
+            header = pd.read_csv(filepath, encoding='utf-8-sig', nrows=0).columns
+            if 'song_name' not in header and 'music_type' not in header:
+                print("流式模式仅支持网易云音乐数据，改为完整加载")
+                return self.load_data(filepath)
+            
+            # 只读取分析需要的列
+            needed = set(NetEaseStreamAggregator.GROUP_COLUMNS) | {'popularity', 'publish_year', 'song_name', 'name'}
+            usecols = [col for col in header if col in needed]
+            dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in usecols}
+            
+            aggregator = NetEaseStreamAggregator()
+            reader = pd.read_csv(filepath, encoding='utf-8-sig', usecols=usecols,
+                                 dtype=dtypes, chunksize=self.chunksize)
+            for chunk in reader:
+                aggregator.update(chunk)
+            
+            self.df = None
+            self.stream_stats = aggregator
+            self.is_netease_data = True
+            print(f"流式加载完成: {aggregator.total_rows} 条记录")
+            return True
+        except Exception as e:
+            print(f"流式加载数据失败: {e}")
+            return False
+    
+    def _has_netease_data(self):
+        """是否已加载网易云音乐数据（完整数据表或流式统计）"""
+        if not self.is_netease_data:
+            return False
+        return self.df is not None or self.stream_stats is not None
+    
     def extract_features(self):
         """提取多维特征"""
         if self.df is None:
@@ -88,6 +356,93 @@ class MusicDataProcessor:
         print("特征标准化完成")
         return self.scaled_features
     
+    def build_neighbor_index(self):
+        """
+        在标准化特征空间上建立KD树，用于查询相似音乐
+        
+        特征只有7维，KD树即可给出精确的最近邻；启用缓存时按数据内容哈希
+        把树保存在列式缓存目录中，同一数据再次加载时直接读取
+        """
+        if self.scaled_features is None:
+            return None
+        
+        cache_path = None
+        if self.use_cache and self.source_hash:
+            cache_path = os.path.join(ColumnarCache.cache_dir_for(self.source_path),
+                                      f'kdtree-{self.source_hash[:16]}.joblib')
+        
+        if cache_path and os.path.exists(cache_path):
+            self.neighbor_index = joblib.load(cache_path, mmap_mode='r')
+        else:
+            self.neighbor_index = KDTree(self.scaled_features)
+            if cache_path:
+                joblib.dump(self.neighbor_index, cache_path)
+        
+        if TRACK_ID_COLUMN in self.df.columns:
+            ids = self.df[TRACK_ID_COLUMN].astype(str)
+            lookup = pd.Series(np.arange(len(ids)), index=ids.to_numpy())
+            # 同一首歌出现多次时以第一次出现为准
+            self.track_lookup = lookup[~lookup.index.duplicated()]
+        else:
+            self.track_lookup = None
+        
+        print("相似音乐索引已建立")
+        return self.neighbor_index
+    
+    def _track_position(self, track):
+        """把音乐标识转换为行位置，找不到时返回None"""
+        if self.track_lookup is not None:
+            position = self.track_lookup.get(str(track))
+            return None if position is None else int(position)
+        
+        try:
+            position = int(track)
+        except (TypeError, ValueError):
+            return None
+        return position if 0 <= position < len(self.df) else None
+    
+    def get_similar_tracks(self, tracks, k=10):
+        """
+        批量查询与给定音乐最相似的k首音乐
+        
+        参数:
+            tracks: 音乐标识列表（track_id列的值，或没有该列时的行号）
+            k: 每首音乐返回的相似音乐数量
+        返回:
+            每首音乐的相似音乐列表，未知的音乐标识对应None
+        """
+        if self.neighbor_index is None:
+            return None
+        
+        positions = [self._track_position(track) for track in tracks]
+        known = [p for p in positions if p is not None]
+        k = max(min(k, len(self.df) - 1), 0)
+        
+        neighbors = {}
+        if known and k > 0:
+            # 多查一个邻居，用于排除音乐自身
+            dist, ind = self.neighbor_index.query(self.scaled_features[known], k=k + 1)
+            for position, row_dist, row_ind in zip(known, dist, ind):
+                keep = row_ind != position
+                neighbors[position] = (row_ind[keep][:k], row_dist[keep][:k])
+        
+        results = []
+        for track, position in zip(tracks, positions):
+            if position is None:
+                results.append(None)
+                continue
+            
+            ids, distances = neighbors.get(position, (np.array([], dtype=np.int64), np.array([])))
+            similar = self._track_records(ids)
+            track_ids = (self.df[TRACK_ID_COLUMN].iloc[ids].astype(str).tolist()
+                         if self.track_lookup is not None else ids.tolist())
+            for track_info, track_id, distance in zip(similar, track_ids, distances.tolist()):
+                track_info['track_id'] = track_id
+                track_info['distance'] = distance
+            results.append({'track': track, 'similar': similar})
+        
+        return results
+    
     def perform_clustering(self, features=None):
         """
         执行K-Means聚类
@@ -101,69 +456,251 @@ class MusicDataProcessor:
                 return None
             features = self.scaled_features
         
-        self.kmeans = KMeans(n_clusters=self.n_clusters, random_state=42, n_init='auto')
-        clusters = self.kmeans.fit_predict(features)
+        if self.auto_k:
+            self.select_n_clusters(features)
+            clusters = self.predict_labels(features)
+        else:
+            clusters = self._fit_labels(features)
         
         self.df['cluster'] = clusters
+        self.build_cluster_index()
         print(f"聚类完成，共{self.n_clusters}个簇")
         return clusters
     
+    def _fit_labels(self, features):
+        """用配置的聚类引擎拟合模型并返回簇标签"""
+        if self.cluster_engine == 'minibatch':
+            return self._fit_minibatch(features)
+        
+        self.kmeans = KMeans(n_clusters=self.n_clusters, random_state=42, n_init='auto')
+        return self.kmeans.fit_predict(features)
+    
+    def _inertia(self, features, labels):
+        """分块计算簇内平方和"""
+        centers = self.kmeans.cluster_centers_
+        total = 0.0
+        for start in range(0, len(features), self.chunksize):
+            end = start + self.chunksize
+            diff = features[start:end] - centers[labels[start:end]]
+            total += float(np.einsum('ij,ij->', diff, diff))
+        return total
+    
+    def select_n_clusters(self, features):
+        """
+        在k_range范围内并行评估候选簇数量，保留轮廓系数最高的模型
+        
+        每个候选k记录簇内平方和（用于肘部法则）、子样本上的轮廓系数和拟合耗时
+        
+        参数:
+            features: 标准化后的特征矩阵
+        返回:
+            评估结果
+        """
+        k_min, k_max = self.k_range
+        candidates_k = [k for k in range(k_min, k_max + 1) if k < len(features)]
+        if not candidates_k:
+            raise ValueError("样本数量不足以自动选择簇数量")
+        
+        engine_params = {
+            'cluster_engine': self.cluster_engine,
+            'batch_size': self.batch_size,
+            'minibatch_epochs': self.minibatch_epochs,
+            'chunksize': self.chunksize,
+        }
+        outcomes = Parallel(n_jobs=self.n_jobs)(
+            delayed(_evaluate_k)(features, k, engine_params, self.silhouette_sample_size)
+            for k in candidates_k
+        )
+        
+        candidates = [result for result, _ in outcomes]
+        scores = [c['silhouette'] if c['silhouette'] == c['silhouette'] else -np.inf
+                  for c in candidates]
+        best = int(np.argmax(scores))
+        
+        self.n_clusters = candidates[best]['k']
+        self.kmeans = outcomes[best][1]
+        self.k_selection = {
+            'criterion': 'silhouette',
+            'sample_size': min(self.silhouette_sample_size, len(features)),
+            'best_k': self.n_clusters,
+            'elbow_k': self._elbow_k(candidates),
+            'candidates': candidates,
+        }
+        print(f"自动选择簇数量: k={self.n_clusters}（肘部法则建议k={self.k_selection['elbow_k']}）")
+        return self.k_selection
+    
+    @staticmethod
+    def _elbow_k(candidates):
+        """肘部法则：归一化后离首尾连线最远的点"""
+        ks = np.array([c['k'] for c in candidates], dtype=float)
+        inertias = np.array([c['inertia'] for c in candidates], dtype=float)
+        if len(ks) < 3:
+            return int(ks[0])
+        
+        x = (ks - ks[0]) / (ks[-1] - ks[0])
+        y = (inertias - inertias.min()) / (np.ptp(inertias) or 1.0)
+        chord = y[0] + (y[-1] - y[0]) * x
+        return int(ks[np.argmax(chord - y)])
+    
+    def _fit_minibatch(self, features):
+        """
+        用小批量K-Means逐块partial_fit，再分块分配簇标签
+        
+        参数:
+            features: 标准化后的特征矩阵
+        返回:
+            簇标签数组
+        """
+        n_rows = len(features)
+        # 块边界；余数并入各块，保证每块样本数都不少于batch_size（数据量足够时）
+        n_chunks = max(1, n_rows // self.batch_size)
+        bounds = np.linspace(0, n_rows, n_chunks + 1, dtype=np.int64)
+        
+        self.kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=42,
+                                      batch_size=self.batch_size, n_init=1)
+        rng = np.random.RandomState(42)
+        for _ in range(self.minibatch_epochs):
+            # 每轮打乱块顺序，避免数据文件本身的排序影响质心
+            for i in rng.permutation(n_chunks):
+                self.kmeans.partial_fit(features[bounds[i]:bounds[i + 1]])
+        
+        return self.predict_labels(features)
+    
+    def predict_labels(self, features):
+        """
+        分块为每条记录分配最近的簇，内存占用只与块大小有关
+        
+        参数:
+            features: 标准化后的特征矩阵
+        返回:
+            簇标签数组
+        """
+        labels = np.empty(len(features), dtype=np.int32)
+        for start in range(0, len(features), self.chunksize):
+            end = start + self.chunksize
+            labels[start:end] = self.kmeans.predict(features[start:end])
+        return labels
+    
+    def build_cluster_index(self):
+        """
+        聚类完成后建立每个簇的行位置索引
+        
+        所有行按 (簇编号, 到所属质心的距离) 排序，每个簇对应其中连续的一段，
+        靠前的就是最有代表性的音乐；同时一次性计算各簇的特征均值
+        """
+        labels = self.df['cluster'].to_numpy()
+        centers = self.kmeans.cluster_centers_
+        
+        distances = np.empty(len(labels), dtype=np.float64)
+        for start in range(0, len(labels), self.chunksize):
+            end = start + self.chunksize
+            diff = self.scaled_features[start:end] - centers[labels[start:end]]
+            distances[start:end] = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        
+        order = np.lexsort((distances, labels))
+        counts = np.bincount(labels, minlength=self.n_clusters)
+        
+        self.cluster_order = order
+        self.cluster_distances = distances[order]
+        self.cluster_offsets = np.concatenate([[0], np.cumsum(counts)])
+        
+        available_features = [col for col in self.feature_columns if col in self.df.columns]
+        self.cluster_feature_means = (
+            self.df.groupby('cluster')[available_features].mean()
+            .reindex(range(self.n_clusters))
+        )
+    
+    def _cluster_slice(self, cluster_id, offset, limit):
+        """返回某个簇按代表性排序后第offset起最多limit条记录的行位置和距离"""
+        begin = self.cluster_offsets[cluster_id]
+        end = self.cluster_offsets[cluster_id + 1]
+        lo = min(begin + offset, end)
+        hi = min(lo + limit, end)
+        return self.cluster_order[lo:hi], self.cluster_distances[lo:hi]
+    
+    def _track_records(self, positions):
+        """把行位置转换为音乐信息列表"""
+        rows = self.df.iloc[positions]
+        
+        def text_column(*candidates):
+            for col in candidates:
+                if col in rows.columns:
+                    return rows[col].astype(str).tolist()
+            return ['Unknown'] * len(rows)
+        
+        names = text_column('name', 'track_name')
+        artists = text_column('artists', 'artist_name')
+        features = [col for col in self.feature_columns if col in rows.columns]
+        values = rows[features].to_numpy(dtype=float)
+        
+        tracks = []
+        for i in range(len(rows)):
+            track_info = {'name': names[i], 'artists': artists[i]}
+            track_info.update(zip(features, values[i].tolist()))
+            tracks.append(track_info)
+        return tracks
+    
     def get_cluster_stats(self):
         """获取每个簇的统计信息"""
         if self.df is None or 'cluster' not in self.df.columns:
             return None
         
         stats = []
-        available_features = [col for col in self.feature_columns if col in self.df.columns]
+        counts = np.diff(self.cluster_offsets)
         
         for cluster_id in range(self.n_clusters):
-            cluster_data = self.df[self.df['cluster'] == cluster_id]
-            cluster_stats = {
+            means = self.cluster_feature_means.loc[cluster_id]
+            stats.append({
                 'cluster_id': int(cluster_id),
-                'count': int(len(cluster_data)),
-                'features': {}
-            }
-            
-            for feature in available_features:
-                cluster_stats['features'][feature] = float(cluster_data[feature].mean())
-            
-            stats.append(cluster_stats)
+                'count': int(counts[cluster_id]),
+                'features': {feature: float(value) for feature, value in means.items()}
+            })
         
         return stats
     
     def get_sample_tracks(self, n_samples=10):
-        """获取每个簇的样本音乐"""
+        """获取每个簇中离质心最近（最有代表性）的样本音乐"""
         if self.df is None or 'cluster' not in self.df.columns:
             return None
         
         samples = []
         for cluster_id in range(self.n_clusters):
-            cluster_data = self.df[self.df['cluster'] == cluster_id]
-            sample_data = cluster_data.head(n_samples)
-            
-            # 构建样本信息
-            cluster_samples = {
+            positions, _ = self._cluster_slice(cluster_id, 0, n_samples)
+            samples.append({
                 'cluster_id': int(cluster_id),
-                'tracks': []
-            }
-            
-            for _, row in sample_data.iterrows():
-                track_info = {
-                    'name': str(row.get('name', row.get('track_name', 'Unknown'))),
-                    'artists': str(row.get('artists', row.get('artist_name', 'Unknown'))),
-                }
-                
-                # 添加可用的特征
-                for feature in self.feature_columns:
-                    if feature in row:
-                        track_info[feature] = float(row[feature])
-                
-                cluster_samples['tracks'].append(track_info)
-            
-            samples.append(cluster_samples)
+                'tracks': self._track_records(positions)
+            })
         
         return samples
     
+    def get_cluster_tracks(self, cluster_id, offset=0, limit=20):
+        """
+        分页获取某个簇的音乐，按到质心的距离从近到远排序
+        
+        参数:
+            cluster_id: 簇编号
+            offset: 起始位置
+            limit: 最多返回的数量
+        返回:
+            分页结果，簇编号无效时返回None
+        """
+        if self.df is None or 'cluster' not in self.df.columns:
+            return None
+        if not 0 <= cluster_id < self.n_clusters:
+            return None
+        
+        positions, distances = self._cluster_slice(cluster_id, max(offset, 0), max(limit, 0))
+        tracks = self._track_records(positions)
+        for track_info, distance in zip(tracks, distances.tolist()):
+            track_info['distance'] = distance
+        
+        return {
+            'cluster_id': int(cluster_id),
+            'total': int(self.cluster_offsets[cluster_id + 1] - self.cluster_offsets[cluster_id]),
+            'offset': max(offset, 0),
+            'tracks': tracks
+        }
+    
     def process_pipeline(self, filepath):
         """
         完整的数据处理流程
@@ -175,27 +712,308 @@ class MusicDataProcessor:
             处理成功返回True，否则返回False
         """
         # 加载数据
-        if not self.load_data(filepath):
+        self._enter_stage('load')
+        loader = self.load_data_streaming if self.streaming else self.load_data
+        if not loader(filepath):
             return False
         
         # 如果是网易云音乐数据，不需要特征提取和聚类
         if self.is_netease_data:
             print("网易云音乐数据已准备好进行分析")
+            self._enter_stage('filter_index')
+            self.build_filter_index()
+            # 词频在加载时算好，请求线程（以及gunicorn预加载后fork出的工作进程）中不再分词
+            self._enter_stage('tokenize')
+            self.get_word_frequencies()
+            self._enter_stage('snapshot')
+            self.build_snapshot(filepath)
+            self._enter_stage('done')
+            return True
+        
+        # 数据和聚类参数都未变化时直接读取已保存的模型
+        self._enter_stage('load_model')
+        if self.load_model():
+            self._enter_stage('neighbor_index')
+            self.build_neighbor_index()
+            self._enter_stage('snapshot')
+            self.build_snapshot(filepath)
+            self._enter_stage('done')
             return True
         
         # 如果是Spotify数据，进行特征提取和聚类
+        self._enter_stage('extract_features')
         features = self.extract_features()
         if features is None:
             return False
         
         # 标准化特征
+        self._enter_stage('standardize')
         self.standardize_features(features)
+        self._enter_stage('neighbor_index')
+        self.build_neighbor_index()
         
         # 执行聚类
+        self._enter_stage('cluster')
         self.perform_clustering()
+        self._enter_stage('save_model')
+        self.save_model()
+        
+        self._enter_stage('snapshot')
+        self.build_snapshot(filepath)
+        self._enter_stage('done')
+        return True
+    
+    def _enter_stage(self, stage):
+        """切换到process_pipeline的下一个阶段，并记录上一个阶段的耗时"""
+        now = time.perf_counter()
+        if self.stage not in (None, 'done') and self._stage_started is not None:
+            self.stage_durations[self.stage] = (self.stage_durations.get(self.stage, 0.0)
+                                                + now - self._stage_started)
+        self.stage = stage
+        self._stage_started = now
+    
+    def remap_from_cache(self):
+        """
+        把数据表、标准化特征、簇标签和索引换成缓存文件的只读内存映射
+        
+        刚从CSV构建完成时这些数组都在进程私有内存中；换成内存映射后，
+        由同一进程fork出的多个工作进程共享操作系统的页缓存，不会各自复制一份
+        
+        返回:
+            成功返回True，未启用缓存或缓存不可用时返回False
+        """
+        if not self.use_cache or self.source_path is None or self.stream_stats is not None:
+            return False
+        
+        cache = ColumnarCache(self.source_path)
+        if not cache.is_valid():
+            return False
+        
+        # 缓存和模型都读取成功后才替换，失败时保留原有的数据表和簇索引
+        df = cache.load()
+        if self.is_netease_data:
+            self.df = df
+            # 筛选索引和作者索引引用的是旧数据表的数组，重新建立以引用内存映射
+            self.build_filter_index()
+            return True
         
+        model = self._read_model(len(df))
+        if model is None:
+            return False
+        self.df = df
+        self._apply_model(model)
+        self.build_neighbor_index()
         return True
     
+    def _model_dir(self):
+        """
+        当前数据和聚类参数对应的模型目录
+        
+        目录名由数据内容哈希和聚类参数的哈希组成；未启用缓存时返回None
+        """
+        if not self.use_cache or not self.source_hash:
+            return None
+        
+        params = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'n_clusters': 'auto' if self.auto_k else self.n_clusters,
+            'k_range': list(self.k_range) if self.auto_k else None,
+            'silhouette_sample_size': self.silhouette_sample_size if self.auto_k else None,
+            'cluster_engine': self.cluster_engine,
+            'batch_size': self.batch_size if self.cluster_engine == 'minibatch' else None,
+            'minibatch_epochs': self.minibatch_epochs if self.cluster_engine == 'minibatch' else None,
+            'feature_columns': self.feature_columns,
+        }
+        params_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        return os.path.join(ColumnarCache.cache_dir_for(self.source_path),
+                            f'model-{self.source_hash[:16]}-{params_hash[:12]}')
+    
+    def save_model(self):
+        """
+        保存拟合好的标准化器、聚类模型、簇标签和簇索引
+        
+        返回:
+            保存成功返回True，否则返回False
+        """
+        model_dir = self._model_dir()
+        if model_dir is None:
+            return False
+        
+        tmp_dir = f'{model_dir}.tmp'
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            joblib.dump({
+                'scaler': self.scaler,
+                'kmeans': self.kmeans,
+                'n_clusters': self.n_clusters,
+                'k_selection': self.k_selection,
+                'cluster_offsets': self.cluster_offsets,
+                'cluster_feature_means': self.cluster_feature_means,
+            }, os.path.join(tmp_dir, 'model.joblib'))
+            np.save(os.path.join(tmp_dir, 'scaled_features.npy'), self.scaled_features)
+            np.save(os.path.join(tmp_dir, 'labels.npy'), self.df['cluster'].to_numpy())
+            np.save(os.path.join(tmp_dir, 'cluster_order.npy'), self.cluster_order)
+            np.save(os.path.join(tmp_dir, 'cluster_distances.npy'), self.cluster_distances)
+            
+            # 整个目录写完后再改名，避免读到不完整的模型
+            shutil.rmtree(model_dir, ignore_errors=True)
+            os.replace(tmp_dir, model_dir)
+            print(f"模型已保存: {model_dir}")
+            return True
+        except Exception as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            print(f"保存模型失败: {e}")
+            return False
+    
+    def load_model(self):
+        """
+        读取与当前数据和聚类参数匹配的已保存模型，跳过特征提取、标准化和聚类
+        
+        返回:
+            找到并读取成功返回True，否则返回False
+        """
+        model = self._read_model(len(self.df))
+        if model is None:
+            return False
+        self._apply_model(model)
+        return True
+    
+    def _read_model(self, n_rows):
+        """
+        读取已保存的模型但不修改当前状态
+        
+        参数:
+            n_rows: 数据表的行数，与保存的簇标签数量不一致时视为不匹配
+        返回:
+            模型内容的字典，没有匹配的模型或读取失败时返回None
+        """
+        model_dir = self._model_dir()
+        if model_dir is None or not os.path.isdir(model_dir):
+            return None
+        
+        try:
+            model = joblib.load(os.path.join(model_dir, 'model.joblib'))
+            labels = np.load(os.path.join(model_dir, 'labels.npy'), mmap_mode='r')
+            if len(labels) != n_rows:
+                return None
+            
+            model['labels'] = labels
+            for name in ('scaled_features', 'cluster_order', 'cluster_distances'):
+                model[name] = np.load(os.path.join(model_dir, f'{name}.npy'), mmap_mode='r')
+            return model
+        except Exception as e:
+            print(f"读取保存的模型失败: {e}")
+            return None
+    
+    def _apply_model(self, model):
+        """把_read_model读取的模型设置到当前数据表上"""
+        self.scaler = model['scaler']
+        self.kmeans = model['kmeans']
+        self.n_clusters = model['n_clusters']
+        self.k_selection = model['k_selection']
+        self.cluster_offsets = model['cluster_offsets']
+        self.cluster_feature_means = model['cluster_feature_means']
+        self.scaled_features = model['scaled_features']
+        self.cluster_order = model['cluster_order']
+        self.cluster_distances = model['cluster_distances']
+        self.df['cluster'] = model['labels']
+        print(f"已读取保存的模型，共{self.n_clusters}个簇")
+    
+    def dataset_version(self, filepath):
+        """
+        计算数据版本标识
+        
+        优先使用缓存得到的内容哈希，否则使用文件大小和修改时间；
+        Spotify数据的聚类结果还取决于簇数量和聚类引擎
+        """
+        if self.source_hash:
+            version = self.source_hash[:16]
+        else:
+            stat = os.stat(filepath)
+            version = f'{stat.st_size:x}{stat.st_mtime_ns:x}'
+        
+        if not self.is_netease_data:
+            k_label = 'auto{}-{}'.format(*self.k_range) if self.auto_k else self.n_clusters
+            version = f'{version}-k{k_label}-{self.cluster_engine}'
+        return version
+    
+    def build_snapshot(self, filepath):
+        """
+        一次性计算所有看板分析结果并保存为只读快照
+        
+        作者排行不放入快照：作者索引已按作品数排好序，请求时只取前N名，
+        不必为每位作者预先生成一条记录
+        
+        参数:
+            filepath: 数据文件路径，用于生成版本标识
+        """
+        if self.is_netease_data:
+            album_analysis = self.get_album_type_analysis()
+            results = {
+                'album_type_analysis': album_analysis,
+                'album_type_top10': self._top10(album_analysis),
+                'music_type_distribution': self.get_music_type_distribution(),
+                'publish_trend': self.get_publish_trend(),
+                'sentiment_trend': self.get_sentiment_trend(),
+            }
+        else:
+            results = {
+                'cluster_stats': self.get_cluster_stats(),
+                'k_selection': self.k_selection,
+            }
+        
+        self.snapshot = AnalyticsSnapshot(self.dataset_version(filepath), results)
+        print(f"分析快照已生成，数据版本: {self.snapshot.version}")
+        return self.snapshot
+    
+    def build_filter_index(self):
+        """
+        建立按音乐类型、专辑类型、作者和发布年份筛选的倒排索引
+        
+        流式模式下没有逐行数据，不支持筛选
+        """
+        if not self.is_netease_data or self.df is None:
+            self.filter_index = None
+            return None
+        
+        self.filter_index = FilterIndex(self.df)
+        print("筛选索引已建立")
+        return self.filter_index
+    
+    def get_filtered_analyses(self, names, filters, top_n=None):
+        """
+        按筛选条件计算看板分析
+        
+        先通过倒排索引选出满足全部条件的行，再只对这些行聚合；
+        结果结构与不筛选时相同
+        
+        参数:
+            names: 分析名称列表，只计算其中属于FILTERABLE_ANALYSES的项
+            filters: 筛选条件，见 FilterIndex.select
+            top_n: 作者排行返回的数量，为None时返回全部
+        返回:
+            分析名称到结果的字典；数据不支持筛选时返回None
+        """
+        if self.filter_index is None or not self.filter_index.supports(filters):
+            return None
+        
+        index = self.filter_index
+        rows = index.select(filters)
+        results = {}
+        for name in names:
+            if name in ('album_type_analysis', 'album_type_top10') and 'album_type_analysis' not in results:
+                results['album_type_analysis'] = index.album_type_analysis(rows)
+            if name == 'album_type_top10':
+                results[name] = self._top10(results['album_type_analysis'])
+            elif name == 'music_type_distribution':
+                results[name] = index.music_type_distribution(rows)
+            elif name == 'publish_trend':
+                results[name] = index.publish_trend(rows)
+            elif name == 'top_artists':
+                results[name] = index.top_artists(rows, top_n)
+        return {name: results[name] for name in names if name in FILTERABLE_ANALYSES}
+    
     def get_album_type_analysis(self):
         """
         分析不同专辑类型的数据分布
@@ -203,9 +1021,12 @@ class MusicDataProcessor:
         返回:
             专辑类型统计信息
         """
-        if self.df is None or not self.is_netease_data:
+        if not self._has_netease_data():
             return None
         
+        if self.stream_stats is not None:
+            return self.stream_stats.album_type_analysis()
+        
         if 'album_type' not in self.df.columns:
             return None
         
@@ -213,7 +1034,7 @@ class MusicDataProcessor:
         album_type_counts = self.df['album_type'].value_counts()
         
         # 计算平均人气
-        album_type_popularity = self.df.groupby('album_type')['popularity'].mean()
+        album_type_popularity = self.df.groupby('album_type', observed=True)['popularity'].mean()
         
         result = []
         for album_type in album_type_counts.index:
@@ -233,9 +1054,12 @@ class MusicDataProcessor:
         返回:
             按年份统计的发布数量
         """
-        if self.df is None or not self.is_netease_data:
+        if not self._has_netease_data():
             return None
         
+        if self.stream_stats is not None:
+            return self.stream_stats.publish_trend()
+        
         if 'publish_year' not in self.df.columns:
             return None
         
@@ -261,9 +1085,12 @@ class MusicDataProcessor:
         返回:
             音乐类型分布统计
         """
-        if self.df is None or not self.is_netease_data:
+        if not self._has_netease_data():
             return None
         
+        if self.stream_stats is not None:
+            return self.stream_stats.music_type_distribution()
+        
         if 'music_type' not in self.df.columns:
             return None
         
@@ -287,7 +1114,11 @@ class MusicDataProcessor:
         返回:
             专辑类型前10名
         """
-        album_analysis = self.get_album_type_analysis()
+        return self._top10(self.get_album_type_analysis())
+    
+    @staticmethod
+    def _top10(album_analysis):
+        """从专辑类型分析结果中取数量前10名"""
         if album_analysis is None:
             return None
         
@@ -299,111 +1130,186 @@ class MusicDataProcessor:
         """
         获取发布作品数量最多的作者
         
+        合作歌曲（artist_name为 "A, B"）计入每一位作者名下；
+        作品数、人气和排名在建立作者倒排索引时已经算好
+        
         参数:
-            top_n: 返回前N名
+            top_n: 返回前N名，为None时返回全部作者的排名
         返回:
             作者及其作品数量
         """
-        if self.df is None or not self.is_netease_data:
+        if not self._has_netease_data():
             return None
         
-        if 'artist_name' not in self.df.columns:
-            return None
+        if self.stream_stats is not None:
+            return self.stream_stats.top_artists(top_n)
         
-        # 统计每个作者的作品数量
-        artist_counts = self.df['artist_name'].value_counts()
-        
-        # 计算平均人气
-        artist_popularity = self.df.groupby('artist_name')['popularity'].mean()
-        
-        result = []
-        for artist in artist_counts.head(top_n).index:
-            result.append({
-                'artist': artist,
-                'count': int(artist_counts[artist]),
-                'avg_popularity': float(artist_popularity[artist])
-            })
+        if self.filter_index is None:
+            self.build_filter_index()
+        if self.filter_index.artists is None:
+            return None
         
-        return result
+        return self.filter_index.artists.top_artists(top_n)
     
-    def generate_wordcloud(self, output_format='base64'):
+    def get_artist_detail(self, name, offset=0, limit=20):
         """
-        生成音乐名称词云图
+        获取某位作者的统计信息和分页的歌曲列表
         
         参数:
-            output_format: 输出格式 ('base64' 或 'file')
+            name: 作者名（单个作者，不是 "A, B" 形式的合作字段）
+            offset: 歌曲列表起始位置
+            limit: 返回的歌曲数量
         返回:
-            base64编码的图片或文件路径
+            作者信息字典，作者不存在时返回None
         """
-        if self.df is None or not self.is_netease_data:
+        if self.filter_index is None or self.filter_index.artists is None:
+            return None
+        
+        detail = self.filter_index.artists.artist_detail(name)
+        if detail is None:
             return None
         
-        song_name_col = 'song_name' if 'song_name' in self.df.columns else 'name'
-        if song_name_col not in self.df.columns:
+        result, rows = detail
+        offset = max(offset, 0)
+        positions = rows[offset:offset + max(limit, 0)]
+        columns = [col for col in NETEASE_TRACK_COLUMNS if col in self.df.columns]
+        tracks = self.df.iloc[positions][columns]
+        result.update({
+            'offset': offset,
+            'tracks': json.loads(tracks.to_json(orient='records', force_ascii=False)),
+        })
+        return result
+    
+    def _token_cache_path(self):
+        """歌名分词缓存文件路径，放在数据文件所在目录，数据更新后仍可复用"""
+        if not self.use_cache or self.source_path is None:
             return None
+        return os.path.join(os.path.dirname(os.path.abspath(self.source_path)), TOKEN_CACHE_FILE)
+    
+    def get_word_frequencies(self):
+        """
+        统计歌曲名称的词频（每个数据版本只分词一次，网易云音乐数据在process_pipeline中预先计算）
         
-        # 合并所有歌曲名称
-        all_names = ' '.join(self.df[song_name_col].astype(str).tolist())
+        返回:
+            词到出现次数的字典，没有可用数据时返回None
+        """
+        if not self._has_netease_data():
+            return None
         
-        # 使用jieba分词
-        words = jieba.cut(all_names)
-        word_list = [w for w in words if len(w) > 1]  # 过滤单字
+        with self._wordcloud_lock:
+            if self._word_freq is not None:
+                return self._word_freq
+            
+            if self.stream_stats is not None:
+                title_counts = self.stream_stats.title_counts
+                if title_counts is None:
+                    return None
+            else:
+                song_name_col = 'song_name' if 'song_name' in self.df.columns else 'name'
+                if song_name_col not in self.df.columns:
+                    return None
+                title_counts = self.df[song_name_col].astype(str).value_counts()
+            
+            # 每个不同的歌名只分词一次（并持久化缓存），按出现次数加权
+            started = time.perf_counter()
+            word_freq = TitleTokenizer(self._token_cache_path()).word_frequencies(title_counts)
+            if self.stage != 'tokenize':
+                # 作为process_pipeline的阶段执行时，耗时由_enter_stage记录
+                self.stage_durations['tokenize'] = time.perf_counter() - started
+            
+            # 移除常见的无意义词
+            stop_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
+            self._word_freq = {k: v for k, v in word_freq.items() if k not in stop_words}
+            return self._word_freq
+    
+    @staticmethod
+    def _find_font():
+        """查找可显示中文的字体（尝试多个常见字体）"""
+        font_paths = [
+            '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+            '/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf',
+            '/System/Library/Fonts/PingFang.ttc',
+            'C:\\Windows\\Fonts\\msyh.ttc',
+            'simhei.ttf'
+        ]
         
-        # 统计词频
-        word_freq = Counter(word_list)
+        for fp in font_paths:
+            if os.path.exists(fp):
+                return fp
+        return None
+    
+    def render_wordcloud_png(self, width=800, height=400, max_words=100):
+        """
+        渲染词云图PNG
         
-        # 移除常见的无意义词
-        stop_words = {'的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也', '很', '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这'}
-        word_freq = {k: v for k, v in word_freq.items() if k not in stop_words}
+        直接由WordCloud对象栅格化，不经过matplotlib；结果按
+        (宽, 高, 最大词数) 缓存在内存中，总大小不超过WORDCLOUD_CACHE_BYTES
         
+        参数:
+            width: 图片宽度
+            height: 图片高度
+            max_words: 最多显示的词数
+        返回:
+            PNG字节，没有可用数据时返回None；渲染失败时抛出异常
+        """
+        word_freq = self.get_word_frequencies()
         if not word_freq:
             return None
         
-        # 生成词云
-        try:
-            # 设置字体路径（尝试多个常见字体）
-            font_paths = [
-                '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
-                '/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf',
-                '/System/Library/Fonts/PingFang.ttc',
-                'C:\\Windows\\Fonts\\msyh.ttc',
-                'simhei.ttf'
-            ]
-            
-            font_path = None
-            for fp in font_paths:
-                if os.path.exists(fp):
-                    font_path = fp
-                    break
+        key = (width, height, max_words)
+        with self._wordcloud_lock:
+            png = self._wordcloud_cache.get(key)
+            if png is not None:
+                self._wordcloud_cache.move_to_end(key)
+                return png
             
+            started = time.perf_counter()
             wc = WordCloud(
-                font_path=font_path,
-                width=800,
-                height=400,
+                font_path=self._find_font(),
+                width=width,
+                height=height,
                 background_color='white',
-                max_words=100,
+                max_words=max_words,
                 relative_scaling=0.5,
                 colormap='viridis'
             ).generate_from_frequencies(word_freq)
             
-            # 生成图片
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wc, interpolation='bilinear')
-            plt.axis('off')
+            buffer = io.BytesIO()
+            wc.to_image().save(buffer, format='PNG', optimize=True)
+            png = buffer.getvalue()
+            self.stage_durations['wordcloud'] = time.perf_counter() - started
+            
+            self._wordcloud_cache[key] = png
+            while sum(len(v) for v in self._wordcloud_cache.values()) > WORDCLOUD_CACHE_BYTES:
+                self._wordcloud_cache.popitem(last=False)
+            return png
+    
+    def generate_wordcloud(self, output_format='base64'):
+        """
+        生成音乐名称词云图
+        
+        参数:
+            output_format: 输出格式 ('base64' 或 'file')
+        返回:
+            base64编码的图片或文件路径
+        """
+        word_freq = self.get_word_frequencies()
+        if not word_freq:
+            return None
+        
+        # 生成词云
+        try:
+            png = self.render_wordcloud_png()
             
             if output_format == 'base64':
                 # 转换为base64
-                buffer = io.BytesIO()
-                plt.savefig(buffer, format='png', bbox_inches='tight', dpi=100)
-                buffer.seek(0)
-                image_base64 = base64.b64encode(buffer.read()).decode()
-                plt.close()
+                image_base64 = base64.b64encode(png).decode()
                 return f'data:image/png;base64,{image_base64}'
             else:
                 # 保存为文件
                 output_file = 'static/wordcloud.png'
-                plt.savefig(output_file, bbox_inches='tight', dpi=100)
-                plt.close()
+                with open(output_file, 'wb') as f:
+                    f.write(png)
                 return output_file
                 
         except Exception as e:
@@ -418,7 +1324,7 @@ class MusicDataProcessor:
         返回:
             情感分析结果
         """
-        if self.df is None or not self.is_netease_data:
+        if not self._has_netease_data():
             return None
         
         # 简化版情感分析（基于关键词）
@@ -0,0 +1,246 @@
+"""
+网易云音乐数据的筛选索引
+为音乐类型、专辑类型、作者和发布年份预先建立 取值 -> 行号 的倒排索引，
+按条件筛选时只访问被选中的行，聚合耗时与选中的行数成正比
+"""
+
+import numpy as np
+import pandas as pd
+
+from artist_index import ArtistIndex
+
+
+# 可按取值筛选的列：请求参数名 -> 列名（作者按拆分后的单个作者筛选）
+CATEGORY_FILTERS = {
+    'music_type': 'music_type',
+    'album_type': 'album_type',
+    'artist': 'artist_name',
+}
+
+# 按年份范围筛选的请求参数
+YEAR_FILTERS = ('year_from', 'year_to')
+
+
+class _CategoryPostings:
+    """一列的倒排索引：按编码分组排列的行号，每个取值占其中连续的一段"""
+
+    def __init__(self, values):
+        """
+        参数:
+            values: 列数据（Series）
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            categories = list(values.cat.categories)
+        else:
+            codes, uniques = pd.factorize(values, sort=True)
+            categories = list(uniques)
+
+        self.codes = codes  # 每行的编码，缺失值为-1
+        self.categories = categories
+        self.code_of = {value: code for code, value in enumerate(categories)}
+        # 稳定排序：同一取值内行号保持递增
+        self.rows = np.argsort(codes, kind='stable').astype(_row_dtype(len(codes)))
+        self.offsets = np.searchsorted(codes[self.rows], np.arange(len(categories) + 1), side='left')
+
+    def lookup_codes(self, values):
+        """把取值列表转为编码数组，不存在的取值忽略"""
+        return np.array([self.code_of[v] for v in values if v in self.code_of], dtype=np.int64)
+
+    def size(self, codes):
+        """这些取值共有多少行"""
+        return int(sum(self.offsets[c + 1] - self.offsets[c] for c in codes))
+
+    def select(self, codes):
+        """这些取值的全部行号"""
+        return np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in codes] or
+                              [self.rows[:0]])
+
+    def mask(self, rows, codes):
+        """rows中取值属于codes的行"""
+        allowed = np.zeros(len(self.categories) + 1, dtype=bool)  # 最后一位对应缺失值（编码-1）
+        allowed[codes] = True
+        return allowed[self.codes[rows]]
+
+    def counts(self, rows, weights=None):
+        """按取值统计rows的行数，或weights（与整列对齐）之和"""
+        codes = self.codes[rows]
+        valid = codes >= 0  # 跳过缺失值
+        if weights is not None:
+            weights = weights[rows][valid]
+        return np.bincount(codes[valid], weights=weights, minlength=len(self.categories))
+
+
+def _row_dtype(n_rows):
+    """行号使用能容纳全部行的最小整数类型"""
+    return np.int32 if n_rows < 2 ** 31 else np.int64
+
+
+class FilterIndex:
+    """按条件筛选行并计算看板分析，结果结构与MusicDataProcessor一致"""
+
+    def __init__(self, df):
+        """
+        参数:
+            df: 网易云音乐数据表
+        """
+        self.n_rows = len(df)
+        self.postings = {param: _CategoryPostings(df[col])
+                         for param, col in CATEGORY_FILTERS.items()
+                         if col in df.columns and param != 'artist'}
+        if 'artist_name' in df.columns:
+            self.postings['artist'] = ArtistIndex(df['artist_name'], df.get('popularity'))
+        self.artists = self.postings.get('artist')  # 作者倒排索引，没有作者列时为None
+
+        if 'publish_year' in df.columns:
+            self.years = df['publish_year'].to_numpy()
+            self.year_rows = np.argsort(self.years, kind='stable').astype(_row_dtype(self.n_rows))
+            self.sorted_years = self.years[self.year_rows]
+        else:
+            self.years = None
+
+        if 'popularity' in df.columns:
+            popularity = df['popularity'].to_numpy(dtype=np.float64)
+            self.pop_valid = ~np.isnan(popularity)
+            self.popularity = np.where(self.pop_valid, popularity, 0.0)
+        else:
+            self.popularity = None
+
+    def supports(self, filters):
+        """数据中是否包含筛选条件用到的列"""
+        for param in filters:
+            if param in YEAR_FILTERS and self.years is None:
+                return False
+            if param in CATEGORY_FILTERS and param not in self.postings:
+                return False
+        return True
+
+    def select(self, filters):
+        """
+        按条件选出行号
+
+        先用选中行数最少的条件从倒排索引中取出候选行，再逐个检查候选行
+        是否满足其余条件，耗时与候选行数成正比
+
+        参数:
+            filters: {'music_type': [...], 'album_type': [...], 'artist': [...],
+                      'year_from': int, 'year_to': int}，省略的条件不限制
+        返回:
+            行号数组（无序）
+        """
+        conditions = []  # (预计行数, 取出候选行的函数, 检查候选行的函数)
+        for param, values in filters.items():
+            if param not in CATEGORY_FILTERS:
+                continue
+            postings = self.postings[param]
+            codes = postings.lookup_codes(values)
+            conditions.append((postings.size(codes),
+                               lambda p=postings, c=codes: p.select(c),
+                               lambda rows, p=postings, c=codes: p.mask(rows, c)))
+
+        if 'year_from' in filters or 'year_to' in filters:
+            year_from = filters.get('year_from')
+            year_to = filters.get('year_to')
+            start = 0 if year_from is None else np.searchsorted(self.sorted_years, year_from, side='left')
+            end = self.n_rows if year_to is None else np.searchsorted(self.sorted_years, year_to, side='right')
+            end = max(end, start)
+            conditions.append((int(end - start),
+                               lambda s=start, e=end: self.year_rows[s:e],
+                               lambda rows, lo=year_from, hi=year_to: self._year_mask(rows, lo, hi)))
+
+        if not conditions:
+            return np.arange(self.n_rows)
+
+        conditions.sort(key=lambda condition: condition[0])
+        rows = conditions[0][1]()
+        for _, _, check in conditions[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[check(rows)]
+        return rows
+
+    def _year_mask(self, rows, year_from, year_to):
+        years = self.years[rows]
+        mask = np.ones(len(rows), dtype=bool)
+        if year_from is not None:
+            mask &= years >= year_from
+        if year_to is not None:
+            mask &= years <= year_to
+        return mask
+
+    def _group_stats(self, param, rows):
+        """
+        按某列统计选中行的数量和人气总和
+
+        返回:
+            (按数量降序排列的编码, 数量, 人气总和, 人气有效行数)
+        """
+        postings = self.postings[param]
+        counts = postings.counts(rows)
+
+        pop_sum = pop_n = None
+        if self.popularity is not None:
+            pop_sum = postings.counts(rows, self.popularity)
+            pop_n = postings.counts(rows, self.pop_valid)
+
+        # 数量相同时按类别顺序排列
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0]
+        return order, counts, pop_sum, pop_n
+
+    @staticmethod
+    def _avg(pop_sum, pop_n, code):
+        if pop_sum is None or not pop_n[code]:
+            return float('nan')
+        return float(pop_sum[code] / pop_n[code])
+
+    def album_type_analysis(self, rows):
+        """专辑类型分布及平均人气"""
+        if 'album_type' not in self.postings:
+            return None
+
+        categories = self.postings['album_type'].categories
+        order, counts, pop_sum, pop_n = self._group_stats('album_type', rows)
+        return [{
+            'type': categories[code],
+            'count': int(counts[code]),
+            'percentage': float(counts[code] / len(rows) * 100),
+            'avg_popularity': self._avg(pop_sum, pop_n, code)
+        } for code in order]
+
+    def music_type_distribution(self, rows):
+        """音乐类型分布"""
+        if 'music_type' not in self.postings:
+            return None
+
+        categories = self.postings['music_type'].categories
+        order, counts, _, _ = self._group_stats('music_type', rows)
+        return [{
+            'type': categories[code],
+            'count': int(counts[code]),
+            'percentage': float(counts[code] / len(rows) * 100)
+        } for code in order]
+
+    def publish_trend(self, rows):
+        """按年份统计的发布数量"""
+        if self.years is None:
+            return None
+
+        years = self.years[rows]
+        years, counts = np.unique(years[years > 0], return_counts=True)
+        return [{'year': int(year), 'count': int(count)} for year, count in zip(years, counts)]
+
+    def top_artists(self, rows, top_n=None):
+        """作品数量最多的前N名作者，top_n为None时返回全部"""
+        if 'artist' not in self.postings:
+            return None
+
+        categories = self.postings['artist'].categories
+        order, counts, pop_sum, pop_n = self._group_stats('artist', rows)
+        if top_n is not None:
+            order = order[:top_n]
+        return [{
+            'artist': categories[code],
+            'count': int(counts[code]),
+            'avg_popularity': self._avg(pop_sum, pop_n, code)
+        } for code in order]
@@ -1,85 +1,138 @@
 """
 生成示例音乐数据
 用于测试和演示，无需下载完整的Kaggle数据集
+
+所有列都由同一个带种子的NumPy随机数生成器向量化生成，结果可复现；
+大数据量时按块写出，并可用多个进程并行生成（见 sample_writer.py）
+
+运行方式:
+    python generate_sample_data.py
+    python generate_sample_data.py --rows 10000000 --output spotify_tracks.csv
+    python generate_sample_data.py --dataset netease --rows 1000000 --output netease_music_data.parquet
 """
 
-import pandas as pd
+import argparse
+
 import numpy as np
+import pandas as pd
+
+from sample_writer import DEFAULT_CHUNK_SIZE, FULL_FRAME_MAX_ROWS, write_chunks
+
+
+# 艺术家列表
+ARTISTS = np.array([
+    'Taylor Swift', 'Ed Sheeran', 'Beyoncé', 'Drake', 'Ariana Grande',
+    'The Weeknd', 'Bruno Mars', 'Post Malone', 'Billie Eilish', 'Justin Bieber',
+    'Adele', 'Coldplay', 'Imagine Dragons', 'Maroon 5', 'Rihanna',
+    'Katy Perry', 'Lady Gaga', 'Dua Lipa', 'Shawn Mendes', 'Sam Smith'
+], dtype=object)
+
+# 歌曲名称前缀
+SONG_PREFIXES = [
+    'Love', 'Dancing', 'Summer', 'Night', 'Dream', 'Heart', 'Paradise',
+    'Midnight', 'Forever', 'Beautiful', 'Wonderful', 'Perfect', 'Golden',
+    'Starlight', 'Moonlight', 'Sunshine', 'Firefly', 'Crystal', 'Ocean'
+]
+
+SONG_SUFFIXES = [
+    'Song', 'Nights', 'Days', 'Memories', 'Story', 'Feelings', 'Vibes',
+    'Dreams', 'Paradise', 'Heaven', 'Magic', 'Wonder', 'Soul', 'Harmony'
+]
+
+# 全部 "前缀 后缀" 组合，按编号取值即可生成歌名
+SONG_NAMES = np.array([f'{prefix} {suffix}' for prefix in SONG_PREFIXES for suffix in SONG_SUFFIXES],
+                      dtype=object)
+
+
+def make_spotify_chunk(rng, start, n_rows):
+    """
+    生成一块Spotify示例数据
+
+    参数:
+        rng: numpy.random.Generator
+        start: 该块第一行的全局行号（Spotify数据没有行号相关的列）
+        n_rows: 行数
+    返回:
+        DataFrame
+    """
+    df = pd.DataFrame({
+        'name': SONG_NAMES[rng.integers(0, len(SONG_NAMES), n_rows)],
+        'artists': ARTISTS[rng.integers(0, len(ARTISTS), n_rows)],
+        'danceability': rng.beta(5, 2, n_rows),  # 偏向高值
+        'energy': rng.beta(3, 3, n_rows),  # 均匀分布
+        'valence': rng.beta(3, 3, n_rows),  # 均匀分布
+        'acousticness': rng.beta(2, 5, n_rows),  # 偏向低值
+        'instrumentalness': rng.beta(1, 9, n_rows),  # 大多数歌曲器乐度低
+        'liveness': rng.beta(2, 8, n_rows),  # 偏向低值
+        'speechiness': rng.beta(1, 9, n_rows),  # 偏向低值
+    })
 
-def generate_sample_data(n_samples=1000, output_file='spotify_tracks.csv'):
+    # 添加一些额外的列（虽然不用于分析）
+    df['duration_ms'] = rng.integers(120000, 300000, n_rows)
+    df['popularity'] = rng.integers(0, 100, n_rows)
+    df['tempo'] = rng.integers(60, 180, n_rows)
+    return df
+
+
+def generate_sample_data(n_samples=1000, output_file='spotify_tracks.csv', seed=42,
+                         chunk_size=DEFAULT_CHUNK_SIZE, n_workers=None):
     """
     生成示例Spotify音乐数据
-    
+
     参数:
         n_samples: 生成的样本数量
-        output_file: 输出文件路径
+        output_file: 输出文件路径，扩展名为 .parquet 时写Parquet（需要pyarrow）
+        seed: 随机种子，相同的种子和块大小总是生成相同的数据
+        chunk_size: 每块的行数
+        n_workers: 并行生成的进程数，默认为CPU核心数
+    返回:
+        生成的DataFrame；行数超过FULL_FRAME_MAX_ROWS时只写入文件，返回None
     """
-    np.random.seed(42)
-    
-    # 艺术家列表
-    artists = [
-        'Taylor Swift', 'Ed Sheeran', 'Beyoncé', 'Drake', 'Ariana Grande',
-        'The Weeknd', 'Bruno Mars', 'Post Malone', 'Billie Eilish', 'Justin Bieber',
-        'Adele', 'Coldplay', 'Imagine Dragons', 'Maroon 5', 'Rihanna',
-        'Katy Perry', 'Lady Gaga', 'Dua Lipa', 'Shawn Mendes', 'Sam Smith'
-    ]
-    
-    # 歌曲名称前缀
-    song_prefixes = [
-        'Love', 'Dancing', 'Summer', 'Night', 'Dream', 'Heart', 'Paradise',
-        'Midnight', 'Forever', 'Beautiful', 'Wonderful', 'Perfect', 'Golden',
-        'Starlight', 'Moonlight', 'Sunshine', 'Firefly', 'Crystal', 'Ocean'
-    ]
-    
-    song_suffixes = [
-        'Song', 'Nights', 'Days', 'Memories', 'Story', 'Feelings', 'Vibes',
-        'Dreams', 'Paradise', 'Heaven', 'Magic', 'Wonder', 'Soul', 'Harmony'
-    ]
-    
-    # 生成数据
-    data = {
-        'name': [
-            f"{np.random.choice(song_prefixes)} {np.random.choice(song_suffixes)}" 
-            for _ in range(n_samples)
-        ],
-        'artists': np.random.choice(artists, n_samples),
-        'danceability': np.random.beta(5, 2, n_samples),  # 偏向高值
-        'energy': np.random.beta(3, 3, n_samples),  # 均匀分布
-        'valence': np.random.beta(3, 3, n_samples),  # 均匀分布
-        'acousticness': np.random.beta(2, 5, n_samples),  # 偏向低值
-        'instrumentalness': np.random.beta(1, 9, n_samples),  # 大多数歌曲器乐度低
-        'liveness': np.random.beta(2, 8, n_samples),  # 偏向低值
-        'speechiness': np.random.beta(1, 9, n_samples),  # 偏向低值
-    }
-    
-    # 创建DataFrame
-    df = pd.DataFrame(data)
-    
-    # 添加一些额外的列（虽然不用于分析）
-    df['duration_ms'] = np.random.randint(120000, 300000, n_samples)
-    df['popularity'] = np.random.randint(0, 100, n_samples)
-    df['tempo'] = np.random.randint(60, 180, n_samples)
-    
-    # 保存到CSV
-    df.to_csv(output_file, index=False)
+    # 行数不多时在内存中保留完整的数据并返回，否则只保留第一个块用于预览
+    collect = n_samples <= FULL_FRAME_MAX_ROWS
+    df = write_chunks(make_spotify_chunk, n_samples, output_file, seed=seed, collect=collect,
+                      chunk_size=chunk_size, n_workers=n_workers)
+
     print(f"✓ 成功生成 {n_samples} 条示例数据")
     print(f"✓ 保存到: {output_file}")
     print("\n数据预览:")
     print(df.head())
     print("\n特征统计:")
     print(df[['danceability', 'energy', 'valence', 'acousticness']].describe())
-    
-    return df
 
-if __name__ == '__main__':
+    return df if collect else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成示例音乐数据')
+    parser.add_argument('--dataset', default='spotify', choices=['spotify', 'netease'], help='数据类型')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='行数（默认Spotify 1000条，网易云音乐500条）')
+    parser.add_argument('--output', default=None,
+                        help='输出文件，扩展名为 .parquet 时写Parquet（默认 spotify_tracks.csv / netease_music_data.csv）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块的行数')
+    parser.add_argument('--workers', type=int, default=None, help='并行生成的进程数，默认为CPU核心数')
+    args = parser.parse_args()
+
     print("=" * 60)
-    print("Spotify 音乐数据生成器")
+    print("Spotify 音乐数据生成器" if args.dataset == 'spotify' else "网易云音乐数据生成器")
     print("=" * 60)
     print("\n这将生成示例数据用于测试应用...")
-    
-    # 生成1000条示例数据
-    generate_sample_data(n_samples=1000)
-    
+
+    if args.dataset == 'spotify':
+        generate_sample_data(n_samples=args.rows or 1000, output_file=args.output or 'spotify_tracks.csv',
+                             seed=args.seed, chunk_size=args.chunk_size, n_workers=args.workers)
+    else:
+        from netease_scraper import generate_sample_netease_data
+        generate_sample_netease_data(n_samples=args.rows or 500,
+                                     output_file=args.output or 'netease_music_data.csv',
+                                     seed=args.seed, chunk_size=args.chunk_size, n_workers=args.workers)
+
     print("\n" + "=" * 60)
     print("完成！现在可以运行 'python app.py' 启动应用")
     print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
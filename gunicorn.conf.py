@@ -0,0 +1,25 @@
+"""
+gunicorn配置
+主进程预先加载数据（preload_app），工作进程fork后共享数据，不再各自加载
+"""
+
+import gc
+import multiprocessing
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# 在主进程中导入应用（即加载数据和聚类），然后再fork工作进程
+preload_app = True
+
+
+def when_ready(server):
+    """工作进程创建前冻结主进程中的对象，避免垃圾回收遍历时触发写时复制"""
+    # 多个工作进程时 /api/reload 返回409，数据更新后需要重启gunicorn
+    import app
+    app.worker_count = server.cfg.workers
+    gc.freeze()
@@ -0,0 +1,96 @@
+"""
+按数据版本缓存的HTTP响应压缩
+同一数据版本下相同URL的响应内容不变，压缩结果只需计算一次
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只使用gzip
+    brotli = None
+
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+# 只压缩文本类响应；PNG等图片本身已经压缩过
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+
+def choose_encoding(accept_encoding):
+    """
+    根据Accept-Encoding请求头选择压缩方式
+
+    参数:
+        accept_encoding: Accept-Encoding请求头的值
+    返回:
+        'br'、'gzip'或None
+    """
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(token.strip().lower())
+
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    """按指定方式压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressedResponseCache:
+    """以 (数据版本, URL, 压缩方式) 为键、按总字节数限制大小的LRU缓存"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        参数:
+            max_bytes: 缓存的压缩数据总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, url, encoding):
+        """获取缓存的 (压缩数据, MIME类型)，不存在时返回None"""
+        with self._lock:
+            key = (version, url, encoding)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, version, url, encoding, body, mimetype):
+        """保存压缩数据；数据版本变化时丢弃旧版本的全部缓存"""
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.total_bytes = 0
+                self.version = version
+
+            key = (version, url, encoding)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous[0])
+
+            self._entries[key] = (body, mimetype)
+            self.total_bytes += len(body)
+            while self.total_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
@@ -0,0 +1,134 @@
+"""
+运行指标
+记录接口延迟直方图，并按Prometheus文本格式输出各项指标
+
+每次请求只做一次二分查找和几次加法，开销很小，可以在生产环境中一直开启
+"""
+
+import bisect
+import threading
+
+
+# 接口延迟直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    """把标签字典格式化为 {a="1",b="2"}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _number(value):
+    """按Prometheus格式输出数值"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class LatencyHistogram:
+    """按路由分别统计的延迟直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        参数:
+            buckets: 递增的桶上限（秒），+Inf桶自动添加
+        """
+        self.buckets = tuple(buckets)
+        self._series = {}  # 标签元组 -> [各桶计数(不累积), 总和, 次数]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        """
+        记录一次耗时
+
+        参数:
+            labels: 可哈希的标签元组，如 (路由, 方法)
+            seconds: 耗时（秒）
+        """
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def samples(self):
+        """返回 [(标签元组, 累积桶计数, 总和, 次数)] 的副本"""
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+
+        result = []
+        for labels, counts, total, count in sorted(items):
+            cumulative = []
+            running = 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            result.append((labels, cumulative, total, count))
+        return result
+
+
+class MetricsWriter:
+    """按Prometheus文本格式逐个写入指标"""
+
+    def __init__(self, prefix='music_'):
+        self.prefix = prefix
+        self._lines = []
+
+    def gauge(self, name, help_text, samples, metric_type='gauge'):
+        """
+        写入一个单值指标
+
+        参数:
+            name: 指标名（不含前缀）
+            help_text: 指标说明
+            samples: [(标签字典, 数值)]，数值为None的样本跳过
+            metric_type: 'gauge' 或 'counter'
+        """
+        name = self.prefix + name
+        self._lines.append(f'# HELP {name} {help_text}')
+        self._lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in samples:
+            if value is not None:
+                self._lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+    def counter(self, name, help_text, samples):
+        """写入一个计数器"""
+        self.gauge(name, help_text, samples, metric_type='counter')
+
+    def histogram(self, name, help_text, histogram, label_names):
+        """
+        写入一个直方图
+
+        参数:
+            histogram: LatencyHistogram
+            label_names: 与直方图标签元组一一对应的标签名
+        """
+        name = self.prefix + name
+        self._lines.append(f'# HELP {name} {help_text}')
+        self._lines.append(f'# TYPE {name} histogram')
+        bounds = histogram.buckets + (float('inf'),)
+        for labels, cumulative, total, count in histogram.samples():
+            base = dict(zip(label_names, labels))
+            for bound, value in zip(bounds, cumulative):
+                self._lines.append(f'{name}_bucket{_labels({**base, "le": _number(float(bound))})} {value}')
+            self._lines.append(f'{name}_sum{_labels(base)} {_number(total)}')
+            self._lines.append(f'{name}_count{_labels(base)} {count}')
+
+    def render(self):
+        """返回完整的文本"""
+        return '\n'.join(self._lines) + '\n'
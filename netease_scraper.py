@@ -4,36 +4,183 @@
 """
 
 import requests
-import json
-import time
+import itertools
 import random
+import threading
+import time
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import os
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from scrape_checkpoint import ScrapeCheckpoint
+from track_sink import DEFAULT_BATCH_SIZE, TrackSink, compact_tracks, iter_chunks, remove_output
+from sample_writer import DEFAULT_CHUNK_SIZE, FULL_FRAME_MAX_ROWS, write_chunks
+
+
+# 默认的API地址，可通过环境变量 NETEASE_BASE_URL 指向本地的测试服务器
+DEFAULT_BASE_URL = 'https://music.163.com/api'
+
+# 响应缓存文件和有效期（秒），可通过环境变量 NETEASE_CACHE_FILE、NETEASE_CACHE_TTL 修改
+DEFAULT_CACHE_FILE = 'netease_cache.sqlite'
+DEFAULT_CACHE_TTL = 86400
+
+# parse_track_info 输出的列
+TRACK_COLUMNS = ['song_id', 'song_name', 'artist_name', 'album_name', 'album_type', 'duration_ms',
+                 'popularity', 'publish_date', 'publish_year', 'music_type']
+
+# 评论表的列：每条评论一行，通过song_id关联歌曲；comment_time为毫秒时间戳，用于增量刷新
+COMMENT_COLUMNS = ['comment_id', 'song_id', 'user_id', 'nickname', 'content', 'liked_count',
+                   'comment_time', 'commented_at', 'fetched_at']
+
+# 歌曲表的默认文件
+DEFAULT_TRACKS_FILE = 'netease_music_data.csv'
+
+# 遇到这些状态码时重试（限流和服务端临时错误）
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def comments_file_for(tracks_file):
+    """歌曲表对应的评论表文件：<文件名>_comments<扩展名>，如 netease_music_data_comments.csv"""
+    root, ext = os.path.splitext(tracks_file)
+    return f'{root}_comments{ext}'
 
 
 class NetEaseMusicScraper:
     """网易云音乐爬虫类"""
     
-    def __init__(self):
+    def __init__(self, base_url=None, rate=5.0, burst=None, max_workers=8, per_host=4, timeout=10,
+                 max_retries=3, backoff=0.5, backoff_max=30.0, use_cache=True, cache_path=None, cache_ttl=None):
+        """
+        参数:
+            base_url: API地址，默认取环境变量 NETEASE_BASE_URL，未设置时为网易云音乐官方地址
+            rate: 所有线程合计每秒最多发出的请求数
+            burst: 允许的突发请求数，默认为 max(1, rate)
+            max_workers: 并发抓取的线程数
+            per_host: 对同一主机同时进行的请求数上限
+            timeout: 单个请求的超时时间（秒）
+            max_retries: 连接失败、超时或遇到429/5xx时的最多重试次数
+            backoff: 重试等待的基数（秒），第n次重试最多等待 backoff * 2^n 秒（随机抖动）
+            backoff_max: 单次重试等待的上限（秒）
+            use_cache: 是否使用磁盘响应缓存
+            cache_path: 缓存文件路径，默认取环境变量 NETEASE_CACHE_FILE，未设置时为 netease_cache.sqlite
+            cache_ttl: 缓存有效期（秒），默认取环境变量 NETEASE_CACHE_TTL，未设置时为1天
+        """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Referer': 'https://music.163.com/'
         }
-        self.base_url = 'https://music.163.com/api'
+        self.base_url = (base_url or os.environ.get('NETEASE_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        # 所有线程共享的限速器，取代逐个歌单之间的随机等待
+        self.limiter = RateLimiter(rate=rate, burst=burst, per_host=per_host)
+        
+        # 复用连接的会话，连接池大小与并发线程数一致
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=per_host, pool_maxsize=max(max_workers, per_host))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
-    def get_hot_playlists(self, limit=50):
+        self.cache = None
+        if use_cache:
+            if cache_ttl is None:
+                cache_ttl = int(os.environ.get('NETEASE_CACHE_TTL', DEFAULT_CACHE_TTL))
+            self.cache = ResponseCache(cache_path or os.environ.get('NETEASE_CACHE_FILE', DEFAULT_CACHE_FILE),
+                                       ttl=cache_ttl)
+        
+        # 请求统计：网络请求、缓存命中、重试和最终失败的次数
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+    
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def _retry_delay(self, attempt, response=None):
+        """第attempt次重试前的等待时间：指数退避加随机抖动，服务端给出Retry-After时至少等待该时长"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.backoff_max))
+        return delay
+    
+    def _get(self, url, params=None, use_cache=True):
+        """
+        发出GET请求并解析JSON
+        
+        先查磁盘缓存，命中时不经过限速器；否则经限速器发出请求，
+        连接失败、超时或遇到429/5xx时按指数退避重试，code为200的响应写入缓存
+        
+        参数:
+            use_cache: 为False时不读取缓存（如增量刷新评论时需要最新数据），code为200的响应仍写入缓存
+        返回:
+            解析后的JSON数据，重试后仍失败时返回None
+        """
+        if self.cache is not None and use_cache:
+            data = self.cache.get(url, params)
+            if data is not None:
+                self._count('cache_hits')
+                return data
+        
+        error = None
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+                time.sleep(self._retry_delay(attempt - 1, response))
+            
+            response = None
+            try:
+                with self.limiter.slot(url):
+                    self._count('requests')
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                continue
+            
+            if response.status_code in RETRY_STATUS_CODES:
+                error = f'HTTP {response.status_code}'
+                continue
+            if response.status_code != 200:
+                error = f'HTTP {response.status_code}'
+                break
+            
+            try:
+                data = response.json()
+            except ValueError as e:
+                error = f'响应不是有效的JSON: {e}'
+                break
+            # 限流和反爬也返回HTTP 200，只是响应中的code不是200（如-460），这类响应不缓存
+            if self.cache is not None and isinstance(data, dict) and data.get('code') == 200:
+                self.cache.put(url, params, data)
+            return data
+        
+        self._count('failures')
+        print(f"  请求失败 {url} {params or ''}: {error}")
+        return None
+    
+    def get_hot_playlists(self, limit=50, use_cache=True):
         """
         获取热门歌单列表
         
         参数:
             limit: 获取歌单数量
+            use_cache: 为False时不读取响应缓存（增量更新需要最新的歌单）
         返回:
             歌单ID列表
         """
         print(f"正在获取热门歌单...")
         # 网易云音乐API
-        url = f'https://music.163.com/api/playlist/list'
+        url = f'{self.base_url}/playlist/list'
         params = {
             'cat': '全部',
             'order': 'hot',
@@ -42,13 +189,11 @@ class NetEaseMusicScraper:
         }
         
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if 'playlists' in data:
-                    playlist_ids = [p['id'] for p in data['playlists']]
-                    print(f"✓ 成功获取 {len(playlist_ids)} 个热门歌单")
-                    return playlist_ids
+            data = self._get(url, params, use_cache=use_cache)
+            if data and 'playlists' in data:
+                playlist_ids = [p['id'] for p in data['playlists']]
+                print(f"✓ 成功获取 {len(playlist_ids)} 个热门歌单")
+                return playlist_ids
         except Exception as e:
             print(f"获取歌单失败: {e}")
         
@@ -66,30 +211,29 @@ class NetEaseMusicScraper:
             991319590,  # 抖音排行榜
         ]
     
-    def get_playlist_tracks(self, playlist_id):
+    def get_playlist_tracks(self, playlist_id, use_cache=True):
         """
         获取歌单中的歌曲信息
         
         参数:
             playlist_id: 歌单ID
+            use_cache: 为False时不读取响应缓存（增量更新需要最新的歌曲列表）
         返回:
-            歌曲信息列表
+            歌曲信息列表（歌单为空时为空列表）；请求失败或响应无效时返回None
         """
-        url = f'https://music.163.com/api/playlist/detail'
+        url = f'{self.base_url}/playlist/detail'
         params = {'id': playlist_id}
         
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if 'result' in data and 'tracks' in data['result']:
-                    tracks = data['result']['tracks']
-                    print(f"  ✓ 歌单 {playlist_id}: 获取 {len(tracks)} 首歌曲")
-                    return tracks
+            data = self._get(url, params, use_cache=use_cache)
+            if data and 'result' in data and 'tracks' in data['result']:
+                tracks = data['result']['tracks']
+                print(f"  ✓ 歌单 {playlist_id}: 获取 {len(tracks)} 首歌曲")
+                return tracks
         except Exception as e:
             print(f"  获取歌单详情失败 {playlist_id}: {e}")
         
-        return []
+        return None
     
     def get_song_comments(self, song_id, limit=20):
         """
@@ -99,32 +243,153 @@ class NetEaseMusicScraper:
             song_id: 歌曲ID
             limit: 评论数量
         返回:
-            评论列表
+            评论内容列表
         """
-        url = f'https://music.163.com/api/v1/resource/comments/R_SO_4_{song_id}'
+        return [comment['content'] for comment in self.fetch_song_comments(song_id, max_comments=limit,
+                                                                            page_size=limit)]
+    
+    def _get_comment_page(self, song_id, offset, page_size, use_cache=True):
+        """获取一页评论（最新的在前），失败时返回None"""
+        url = f'{self.base_url}/v1/resource/comments/R_SO_4_{song_id}'
         params = {
-            'limit': limit,
-            'offset': 0
+            'limit': page_size,
+            'offset': offset
         }
         
         try:
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                if 'comments' in data:
-                    return [c['content'] for c in data['comments']]
+            data = self._get(url, params, use_cache=use_cache)
+            if data and 'comments' in data:
+                return data
         except Exception as e:
-            print(f"  获取评论失败: {e}")
+            print(f"  获取评论失败 {song_id}: {e}")
+        return None
+    
+    @staticmethod
+    def _normalize_comment(song_id, comment, fetched_at):
+        """把一条原始评论转为评论表的一行"""
+        comment_time = int(comment.get('time') or 0)
+        user = comment.get('user') or {}
+        return {
+            'comment_id': comment.get('commentId'),
+            'song_id': song_id,
+            'user_id': user.get('userId'),
+            'nickname': user.get('nickname', ''),
+            'content': comment.get('content', ''),
+            'liked_count': comment.get('likedCount', 0),
+            'comment_time': comment_time,
+            'commented_at': datetime.fromtimestamp(comment_time / 1000).strftime('%Y-%m-%d %H:%M:%S')
+            if comment_time else '',
+            'fetched_at': fetched_at,
+        }
+    
+    def fetch_song_comments(self, song_id, max_comments=100, page_size=20, since=None):
+        """
+        分页获取一首歌的评论
+        
+        评论按时间从新到旧返回，依次请求后续页，直到取满max_comments条、没有更多评论，
+        或遇到不晚于since的评论（增量刷新时之后的评论都已保存过）
+        
+        参数:
+            song_id: 歌曲ID
+            max_comments: 最多获取的评论数
+            page_size: 每页评论数
+            since: 已保存的最新评论时间（毫秒时间戳），只获取比它更新的评论；为None时获取全部
+        返回:
+            评论表的行（字典）列表，最新的在前
+        """
+        fetched_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        comments = []
+        offset = 0
+        while len(comments) < max_comments:
+            # 增量刷新需要最新数据，不读取缓存
+            data = self._get_comment_page(song_id, offset, page_size, use_cache=since is None)
+            if not data or not data['comments']:
+                break
+            for comment in data['comments']:
+                if since is not None and int(comment.get('time') or 0) <= since:
+                    return comments
+                comments.append(self._normalize_comment(song_id, comment, fetched_at))
+                if len(comments) >= max_comments:
+                    break
+            if not data.get('more'):
+                break
+            offset += len(data['comments'])
+        return comments
+    
+    def _latest_comment_times(self, comments_file):
+        """评论表中每首歌已保存的最新评论时间"""
+        latest = {}
+        if not os.path.exists(comments_file) and not os.path.isdir(f'{comments_file}.parts'):
+            return latest
+        for chunk in iter_chunks(comments_file, columns=['song_id', 'comment_time']):
+            times = pd.to_numeric(chunk['comment_time'], errors='coerce')
+            grouped = times.groupby(chunk['song_id'].astype(str)).max()
+            for song_id, comment_time in grouped.dropna().items():
+                if comment_time > latest.get(song_id, -1):
+                    latest[song_id] = int(comment_time)
+        return latest
+    
+    def harvest_comments(self, song_ids=None, tracks_file=DEFAULT_TRACKS_FILE, output_file=None,
+                         max_comments=100, page_size=20, refresh=False, append=False, batch_size=DEFAULT_BATCH_SIZE,
+                         compact=None):
+        """
+        获取评论并写入单独的评论表
+        
+        各歌曲的评论在线程池中并发获取（请求速率由共享的限速器控制），每首歌分页获取；
+        结果按批写入评论表，输出格式由扩展名决定（与歌曲表相同，见 TrackSink）
+        
+        参数:
+            song_ids: 歌曲ID列表，为None时读取tracks_file中的全部歌曲
+            tracks_file: 歌曲表文件
+            output_file: 评论表文件，默认为 <tracks_file文件名>_comments<扩展名>
+            max_comments: 每首歌最多获取的评论数
+            page_size: 每页评论数
+            refresh: 增量刷新：保留已有评论，每首歌只获取比已保存的最新评论更新的评论
+            append: 保留已有评论，直接追加获取到的评论，不读取已保存的评论时间（用于还没有评论的新歌曲）；
+                refresh和append都为False时重新创建评论表
+            batch_size: 每批写入的评论数
+            compact: 结束后是否按comment_id去重压缩评论表，默认只对Parquet压缩（合并分片）
+        返回:
+            本次写入的评论数
+        """
+        if song_ids is None:
+            song_ids = []
+            for chunk in iter_chunks(tracks_file, columns=['song_id']):
+                song_ids.extend(chunk['song_id'].dropna().tolist())
+        song_ids = list(dict.fromkeys(song_ids))
+        output_file = output_file or comments_file_for(tracks_file)
+        print(f"\n正在获取 {len(song_ids)} 首歌曲的评论...")
+        
+        latest = self._latest_comment_times(output_file) if refresh else {}
+        sink = TrackSink(output_file, COMMENT_COLUMNS, append=refresh or append)
+        n_written = 0
+        
+        def fetch(song_id):
+            return self.fetch_song_comments(song_id, max_comments=max_comments, page_size=page_size,
+                                            since=latest.get(str(song_id)))
+        
+        # 分段提交任务，避免歌曲很多时一次创建全部任务
+        window = self.max_workers * 8
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(song_ids), window):
+                for comments in executor.map(fetch, song_ids[start:start + window]):
+                    sink.write(comments)
+                    n_written += len(comments)
+                    if sink.buffered >= batch_size:
+                        sink.flush()
+        sink.close()
         
-        return []
+        if compact or (compact is None and sink.format == 'parquet'):
+            compact_tracks(output_file, key='comment_id')
+        print(f"✓ 共获取 {n_written} 条{'新' if refresh or append else ''}评论，已保存到: {output_file}")
+        return n_written
     
-    def parse_track_info(self, track, include_comments=False):
+    def parse_track_info(self, track):
         """
-        解析歌曲信息
+        解析歌曲信息（评论由 harvest_comments 单独获取）
         
         参数:
             track: 原始歌曲数据
-            include_comments: 是否包含评论
         返回:
             结构化的歌曲信息
         """
@@ -155,160 +420,310 @@ class NetEaseMusicScraper:
                 music_type = track.get('type', '流行')
             track_info['music_type'] = music_type
             
-            # 获取评论（如果需要）
-            if include_comments:
-                comments = self.get_song_comments(track_info['song_id'], limit=10)
-                track_info['comments'] = comments
-            else:
-                track_info['comments'] = []
-            
             return track_info
             
         except Exception as e:
             print(f"  解析歌曲信息失败: {e}")
             return None
     
-    def scrape_music_data(self, num_playlists=5, include_comments=False, output_file='netease_music_data.csv'):
+    def scrape_music_data(self, num_playlists=5, include_comments=False, output_file='netease_music_data.csv',
+                          resume=False, append=False, checkpoint_file=None, batch_size=DEFAULT_BATCH_SIZE,
+                          compact=None, comments_file=None, max_comments=100):
         """
         爬取网易云音乐数据
         
+        解析出的新歌曲先放入缓冲区，累计达到batch_size首后作为一批写入输出文件，
+        随后在断点文件中记录这一批对应的歌单和歌曲ID；内存中只保留一批数据和已知的歌曲ID，
+        中途崩溃时已写入的歌单不会丢失
+        
         参数:
             num_playlists: 爬取歌单数量
-            include_comments: 是否包含评论
-            output_file: 输出文件路径
+            include_comments: 是否获取评论：歌曲全部写入后，由 harvest_comments 获取本次新歌曲的评论，
+                追加到单独的评论表（resume和append都为False时，评论表随输出文件一起重新创建）
+            output_file: 输出文件路径，扩展名为 .jsonl 时写JSONL，为 .parquet 时写Parquet（需要pyarrow），
+                否则写CSV；为None时不保存，也不记录断点
+            resume: 从上次中断处继续：跳过断点中本轮已处理完的歌单，新歌曲追加到输出文件
+            append: 增量更新：保留输出文件中已有的歌曲，只追加新歌曲（已知歌曲不再解析和获取评论）；
+                不读取歌单的响应缓存，否则有效期内的定时更新只会读到旧的歌单
+            checkpoint_file: 断点文件路径，默认为 <output_file>.checkpoint.sqlite
+            batch_size: 每批写入的歌曲数
+            compact: 结束后是否按song_id去重压缩输出文件，默认只对Parquet压缩（合并分片）
+            comments_file: 评论表文件，默认为 <输出文件名>_comments<扩展名>（见 comments_file_for）
+            max_comments: 每首歌最多获取的评论数
         返回:
-            DataFrame
+            output_file为None时返回歌曲DataFrame；否则返回本次新写入的歌曲数
         """
         print("=" * 60)
         print("网易云音乐数据爬虫启动")
         print("=" * 60)
         
-        # 获取热门歌单
-        playlist_ids = self.get_hot_playlists(limit=num_playlists)[:num_playlists]
+        # 增量更新需要最新的歌单，不读取缓存；继续中断的爬取时缓存可以避免重复请求
+        use_cache = resume or not append
+        playlist_ids = self.get_hot_playlists(limit=num_playlists, use_cache=use_cache)[:num_playlists]
+        
+        comments_file = comments_file or comments_file_for(output_file or DEFAULT_TRACKS_FILE)
+        sink = None
+        checkpoint = None
+        known_ids = set()
+        done_playlists = set()
+        if output_file:
+            sink = TrackSink(output_file, TRACK_COLUMNS, append=resume or append)
+            checkpoint = ScrapeCheckpoint(checkpoint_file or f'{output_file}.checkpoint.sqlite')
+            if resume or append:
+                if checkpoint.matches(sink.signature()):
+                    known_ids = checkpoint.known_song_ids()
+                else:
+                    # 数据在上次记录之后被改动过（如重新生成或中途崩溃），以文件内容为准
+                    known_ids = sink.existing_song_ids()
+                    checkpoint.sync_songs(known_ids, sink.signature())
+                if resume:
+                    done_playlists = checkpoint.processed_playlists()
+                print(f"已有 {len(known_ids)} 首歌曲，本轮已处理 {len(done_playlists)} 个歌单")
+            else:
+                checkpoint.reset(sink.signature())
+                # 歌曲表已重新创建，旧的评论不再对应其中的歌曲
+                remove_output(comments_file)
         
-        all_tracks = []
-        seen_ids = set()
+        pending = [playlist_id for playlist_id in playlist_ids if str(playlist_id) not in done_playlists]
+        all_tracks = []  # 只在不保存文件时使用
+        new_song_ids = []  # 需要获取评论的新歌曲
+        n_written = 0
+        batch_playlists = []
+        batch_ids = []
         
-        # 遍历每个歌单
-        for idx, playlist_id in enumerate(playlist_ids, 1):
-            print(f"\n[{idx}/{len(playlist_ids)}] 处理歌单 {playlist_id}...")
-            
-            # 获取歌单歌曲
-            tracks = self.get_playlist_tracks(playlist_id)
-            
-            # 解析每首歌曲
-            for track in tracks:
-                track_info = self.parse_track_info(track, include_comments)
-                if track_info and track_info['song_id'] not in seen_ids:
-                    all_tracks.append(track_info)
-                    seen_ids.add(track_info['song_id'])
+        def flush_batch():
+            # 先写数据再记录断点
+            sink.flush()
+            checkpoint.mark_playlists(batch_playlists, batch_ids, sink.signature())
+            batch_playlists.clear()
+            batch_ids.clear()
+        
+        def fetch_playlists(executor):
+            # 按歌单顺序返回结果；同时在途的歌单数有上限，前面的歌单较慢时后面的原始数据不会堆积在内存中
+            window = self.max_workers * 2
+            futures = deque()
+            for playlist_id in pending:
+                futures.append((playlist_id, executor.submit(self.get_playlist_tracks, playlist_id,
+                                                             use_cache=use_cache)))
+                if len(futures) >= window:
+                    playlist_id, future = futures.popleft()
+                    yield playlist_id, future.result()
+            while futures:
+                playlist_id, future = futures.popleft()
+                yield playlist_id, future.result()
+        
+        try:
+            # 歌单在线程池中并发获取，请求速率由共享的限速器控制；结果按歌单顺序处理
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                playlists = fetch_playlists(executor)
+                for idx, (playlist_id, tracks) in enumerate(playlists, 1):
+                    print(f"\n[{idx}/{len(pending)}] 处理歌单 {playlist_id}...")
+                    if tracks is None:
+                        # 获取失败的歌单不记入断点，下次继续时重新获取
+                        print(f"  ✗ 歌单 {playlist_id} 获取失败，跳过")
+                        continue
+                    
+                    # 先按ID去掉已知的歌曲，只解析新歌曲
+                    new_tracks = {}
+                    for track in tracks:
+                        song_id = str(track.get('id', ''))
+                        if song_id not in known_ids and song_id not in new_tracks:
+                            new_tracks[song_id] = track
+                    
+                    parsed = [self.parse_track_info(track) for track in new_tracks.values()]
+                    parsed = [track_info for track_info in parsed if track_info]
+                    known_ids.update(str(track_info['song_id']) for track_info in parsed)
+                    if include_comments:
+                        new_song_ids.extend(track_info['song_id'] for track_info in parsed)
+                    
+                    if sink is None:
+                        all_tracks.extend(parsed)
+                        continue
+                    sink.write(parsed)
+                    n_written += len(parsed)
+                    batch_playlists.append(playlist_id)
+                    batch_ids.extend(track_info['song_id'] for track_info in parsed)
+                    if sink.buffered >= batch_size:
+                        flush_batch()
             
-            # 随机延迟，避免请求过快
-            time.sleep(random.uniform(0.5, 1.5))
+            if sink is not None:
+                flush_batch()
+                if compact or (compact is None and sink.format == 'parquet'):
+                    compact_tracks(output_file)
+                    checkpoint.set_output(sink.signature())
+                checkpoint.finish_run()
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
         
-        print(f"\n✓ 共爬取 {len(all_tracks)} 首不重复的歌曲")
+        print(f"\n✓ 共爬取 {n_written if sink is not None else len(all_tracks)} 首新歌曲")
         
-        # 转换为DataFrame
-        df = pd.DataFrame(all_tracks)
+        # 评论作为单独的阶段获取，新歌曲还没有评论，直接追加到评论表（歌曲表重新创建时评论表已清空）
+        if include_comments and new_song_ids:
+            self.harvest_comments(new_song_ids, output_file=comments_file, max_comments=max_comments,
+                                  append=True, batch_size=batch_size, compact=compact)
         
-        # 保存到文件
-        if output_file:
-            df.to_csv(output_file, index=False, encoding='utf-8-sig')
-            print(f"✓ 数据已保存到: {output_file}")
+        print(f"  网络请求 {self.stats['requests']} 次，缓存命中 {self.stats['cache_hits']} 次，"
+              f"重试 {self.stats['retries']} 次，失败 {self.stats['failures']} 次")
+        if sink is None:
+            return pd.DataFrame(all_tracks, columns=TRACK_COLUMNS)
         
-        return df
+        print(f"✓ 数据已保存到: {output_file}")
+        return n_written
+
+
+# 示例数据使用的中文歌手列表
+SAMPLE_ARTISTS = [
+    '周杰伦', '林俊杰', '邓紫棋', '薛之谦', '毛不易',
+    '李荣浩', '陈奕迅', '张学友', '王力宏', '孙燕姿',
+    '五月天', '许嵩', '汪苏泷', '徐佳莹', '田馥甄',
+    '蔡依林', '张杰', '华晨宇', '李宇春', '周深'
+]
+
+# 专辑类型
+SAMPLE_ALBUM_TYPES = ['录音室专辑', '现场专辑', 'EP/单曲', '精选集', '合辑']
+SAMPLE_ALBUM_TYPE_WEIGHTS = [0.5, 0.1, 0.25, 0.1, 0.05]
 
+# 音乐类型
+SAMPLE_MUSIC_TYPES = ['流行', '摇滚', '民谣', '电子', '说唱', '古风', '轻音乐', '爵士', 'R&B']
+SAMPLE_MUSIC_TYPE_WEIGHTS = [0.4, 0.15, 0.15, 0.1, 0.08, 0.05, 0.03, 0.02, 0.02]
 
-def generate_sample_netease_data(n_samples=500, output_file='netease_music_data.csv'):
+# 歌曲名称元素
+SAMPLE_SONG_PREFIXES = [
+    '晴天', '夜曲', '告白气球', '七里香', '青花瓷', '彩虹',
+    '稻香', '不能说的秘密', '等你下课', '说好不哭', '爱情转移',
+    '十年', '富士山下', '好久不见', '浮夸', '红玫瑰',
+    '演员', '丑八怪', '认真的雪', '意外', '天后'
+]
+SAMPLE_TITLE_PARTS = ['爱', '心', '梦', '夜', '天', '海', '星', '月', '雨', '风',
+                      '花', '城', '路', '桥', '歌', '诗', '舞', '光', '影', '声']
+
+# 发布年份范围（2000-2024，共25年）及分布，越近的年份越多
+SAMPLE_FIRST_YEAR = 2000
+SAMPLE_LAST_YEAR = 2024
+SAMPLE_YEAR_PROBS = np.array([0.02] * 10 + [0.05] * 5 + [0.1] * 5 + [0.15] * 5)
+SAMPLE_YEAR_PROBS = SAMPLE_YEAR_PROBS / SAMPLE_YEAR_PROBS.sum()
+
+# 示例数据中第一首歌的ID
+SAMPLE_FIRST_SONG_ID = 1000000
+
+_sample_tables = None
+
+
+def _get_sample_tables():
+    """
+    预先生成所有可能的歌名、专辑名和发布日期
+
+    生成数据时只需抽取编号再按编号取值，不必逐行拼接字符串
+    """
+    global _sample_tables
+    if _sample_tables is None:
+        # 由2-4个字组成的歌名，按长度依次排列
+        titles = []
+        title_offsets = {}
+        for length in (2, 3, 4):
+            title_offsets[length] = len(titles)
+            titles.extend(''.join(parts) for parts in itertools.product(SAMPLE_TITLE_PARTS, repeat=length))
+
+        years = range(SAMPLE_FIRST_YEAR, SAMPLE_LAST_YEAR + 1)
+        _sample_tables = {
+            'prefixes': np.array(SAMPLE_SONG_PREFIXES, dtype=object),
+            'titles': np.array(titles, dtype=object),
+            'title_offsets': title_offsets,
+            'artists': np.array(SAMPLE_ARTISTS, dtype=object),
+            # 每位歌手10张专辑
+            'albums': np.array([f'{artist}专辑_{i}' for artist in SAMPLE_ARTISTS for i in range(1, 11)],
+                               dtype=object),
+            'album_types': np.array(SAMPLE_ALBUM_TYPES, dtype=object),
+            'music_types': np.array(SAMPLE_MUSIC_TYPES, dtype=object),
+            # 每年12个月，每月1-28日
+            'dates': np.array([f'{year}-{month:02d}-{day:02d}'
+                               for year in years for month in range(1, 13) for day in range(1, 29)],
+                              dtype=object),
+        }
+    return _sample_tables
+
+
+def make_netease_chunk(rng, start, n_rows):
+    """
+    生成一块网易云音乐示例数据
+
+    参数:
+        rng: numpy.random.Generator
+        start: 该块第一行的全局行号，用于生成连续的song_id
+        n_rows: 行数
+    返回:
+        DataFrame
+    """
+    tables = _get_sample_tables()
+    n_parts = len(SAMPLE_TITLE_PARTS)
+
+    # 30%使用预定义标题，其余由2-4个字随机组合
+    lengths = rng.integers(2, 5, n_rows)
+    digits = rng.integers(0, n_parts, (n_rows, 4))
+    codes = np.zeros(n_rows, dtype=np.int64)
+    for position in range(4):
+        used = lengths > position
+        codes[used] = codes[used] * n_parts + digits[used, position]
+    codes += np.select([lengths == 2, lengths == 3, lengths == 4],
+                       [tables['title_offsets'][2], tables['title_offsets'][3], tables['title_offsets'][4]])
+    song_names = np.where(rng.random(n_rows) < 0.3,
+                          tables['prefixes'][rng.integers(0, len(SAMPLE_SONG_PREFIXES), n_rows)],
+                          tables['titles'][codes])
+
+    year_index = rng.choice(len(SAMPLE_YEAR_PROBS), n_rows, p=SAMPLE_YEAR_PROBS)
+    album_artist = rng.integers(0, len(SAMPLE_ARTISTS), n_rows)
+
+    return pd.DataFrame({
+        'song_id': np.arange(SAMPLE_FIRST_SONG_ID + start, SAMPLE_FIRST_SONG_ID + start + n_rows),
+        'song_name': song_names,
+        'artist_name': tables['artists'][rng.integers(0, len(SAMPLE_ARTISTS), n_rows)],
+        'album_name': tables['albums'][album_artist * 10 + rng.integers(0, 10, n_rows)],
+        'album_type': tables['album_types'][rng.choice(len(SAMPLE_ALBUM_TYPES), n_rows,
+                                                       p=SAMPLE_ALBUM_TYPE_WEIGHTS)],
+        'music_type': tables['music_types'][rng.choice(len(SAMPLE_MUSIC_TYPES), n_rows,
+                                                       p=SAMPLE_MUSIC_TYPE_WEIGHTS)],
+        'duration_ms': rng.integers(180000, 360000, n_rows),
+        'popularity': rng.integers(0, 100, n_rows),
+        'publish_year': year_index + SAMPLE_FIRST_YEAR,
+        'publish_date': tables['dates'][year_index * 12 * 28 + rng.integers(0, 12 * 28, n_rows)],
+    })
+
+
+def generate_sample_netease_data(n_samples=500, output_file='netease_music_data.csv', seed=42,
+                                 chunk_size=DEFAULT_CHUNK_SIZE, n_workers=None):
     """
     生成网易云音乐示例数据（用于测试，无需实际爬取）
-    
+
+    所有列都由带种子的NumPy随机数生成器向量化生成，结果可复现；
+    按块写出，块较多时用多个进程并行生成
+
     参数:
         n_samples: 生成样本数量
-        output_file: 输出文件路径
+        output_file: 输出文件路径，扩展名为 .parquet 时写Parquet（需要pyarrow）
+        seed: 随机种子，相同的种子和块大小总是生成相同的数据
+        chunk_size: 每块的行数
+        n_workers: 并行生成的进程数，默认为CPU核心数
     返回:
-        DataFrame
+        生成的DataFrame；行数超过FULL_FRAME_MAX_ROWS时只写入文件，返回None
     """
-    import numpy as np
-    
     print("=" * 60)
     print("生成网易云音乐示例数据")
     print("=" * 60)
-    
-    np.random.seed(42)
-    
-    # 中文歌手列表
-    artists = [
-        '周杰伦', '林俊杰', '邓紫棋', '薛之谦', '毛不易',
-        '李荣浩', '陈奕迅', '张学友', '王力宏', '孙燕姿',
-        '五月天', '许嵩', '汪苏泷', '徐佳莹', '田馥甄',
-        '蔡依林', '张杰', '华晨宇', '李宇春', '周深'
-    ]
-    
-    # 专辑类型
-    album_types = ['录音室专辑', '现场专辑', 'EP/单曲', '精选集', '合辑']
-    album_type_weights = [0.5, 0.1, 0.25, 0.1, 0.05]
-    
-    # 音乐类型
-    music_types = ['流行', '摇滚', '民谣', '电子', '说唱', '古风', '轻音乐', '爵士', 'R&B']
-    music_type_weights = [0.4, 0.15, 0.15, 0.1, 0.08, 0.05, 0.03, 0.02, 0.02]
-    
-    # 歌曲名称元素
-    song_prefixes = [
-        '晴天', '夜曲', '告白气球', '七里香', '青花瓷', '彩虹',
-        '稻香', '不能说的秘密', '等你下课', '说好不哭', '爱情转移',
-        '十年', '富士山下', '好久不见', '浮夸', '红玫瑰',
-        '演员', '丑八怪', '认真的雪', '意外', '天后'
-    ]
-    
-    song_titles = []
-    for _ in range(n_samples):
-        if random.random() < 0.3:
-            # 使用预定义标题
-            song_titles.append(random.choice(song_prefixes))
-        else:
-            # 组合生成
-            parts = ['爱', '心', '梦', '夜', '天', '海', '星', '月', '雨', '风',
-                    '花', '城', '路', '桥', '歌', '诗', '舞', '光', '影', '声']
-            title = ''.join(random.choices(parts, k=random.randint(2, 4)))
-            song_titles.append(title)
-    
-    # 生成数据
-    current_year = 2024
-    # 生成年份分布（2000-2024，共25年）
-    year_probs = [0.02] * 10 + [0.05] * 5 + [0.1] * 5 + [0.15] * 5
-    # 归一化确保总和为1
-    year_probs = np.array(year_probs) / sum(year_probs)
-    years = np.random.choice(range(2000, current_year + 1), n_samples, p=year_probs)
-    
-    data = {
-        'song_id': range(1000000, 1000000 + n_samples),
-        'song_name': song_titles,
-        'artist_name': np.random.choice(artists, n_samples),
-        'album_name': [f'{artist}专辑_{random.randint(1, 10)}' 
-                      for artist in np.random.choice(artists, n_samples)],
-        'album_type': np.random.choice(album_types, n_samples, p=album_type_weights),
-        'music_type': np.random.choice(music_types, n_samples, p=music_type_weights),
-        'duration_ms': np.random.randint(180000, 360000, n_samples),
-        'popularity': np.random.randint(0, 100, n_samples),
-        'publish_year': years,
-        'publish_date': [f'{year}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}' 
-                        for year in years],
-    }
-    
-    # 创建DataFrame
-    df = pd.DataFrame(data)
-    
-    # 保存到CSV
-    df.to_csv(output_file, index=False, encoding='utf-8-sig')
+
+    # 行数不多时在内存中保留完整的数据并返回，否则只保留第一个块用于预览
+    collect = n_samples <= FULL_FRAME_MAX_ROWS
+    df = write_chunks(make_netease_chunk, n_samples, output_file, seed=seed, collect=collect,
+                      chunk_size=chunk_size, n_workers=n_workers, encoding='utf-8-sig')
+
     print(f"✓ 成功生成 {n_samples} 条示例数据")
     print(f"✓ 保存到: {output_file}")
     print("\n数据预览:")
     print(df.head(10))
     print("\n数据统计:")
     print(df[['music_type', 'album_type', 'publish_year']].describe())
-    
-    return df
+
+    return df if collect else None
 
 
 if __name__ == '__main__':
@@ -318,16 +733,24 @@ if __name__ == '__main__':
     print("\n选择数据获取方式:")
     print("1. 生成示例数据（快速，用于测试）")
     print("2. 爬取真实数据（需要网络，可能受限）")
+    print("3. 增量更新（只把新歌曲追加到已有数据）")
+    print("4. 继续上次中断的爬取")
+    print("5. 增量更新评论（只获取已有歌曲的新评论）")
     
-    choice = input("\n请选择 (1/2，默认1): ").strip() or '1'
+    choice = input("\n请选择 (1/2/3/4/5，默认1): ").strip() or '1'
     
-    if choice == '2':
+    if choice == '5':
+        scraper = NetEaseMusicScraper()
+        scraper.harvest_comments(tracks_file='netease_music_data.csv', refresh=True)
+    elif choice in ('2', '3', '4'):
         # 真实爬取
         scraper = NetEaseMusicScraper()
         df = scraper.scrape_music_data(
             num_playlists=5,
             include_comments=False,
-            output_file='netease_music_data.csv'
+            output_file='netease_music_data.csv',
+            append=choice == '3',
+            resume=choice == '4'
         )
     else:
         # 生成示例数据
@@ -0,0 +1,78 @@
+"""
+爬虫请求限速
+所有线程共享一个令牌桶控制总请求速率，并限制对每个主机同时进行的请求数
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """线程安全的令牌桶：平均每秒发放rate个令牌，最多积累capacity个"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        参数:
+            rate: 每秒发放的令牌数（即平均每秒请求数）
+            capacity: 桶容量，决定允许的突发请求数，默认为 max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError("rate必须大于0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，令牌不足时阻塞等待（等待时不持有锁）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """全局令牌桶 + 每个主机的并发上限"""
+
+    def __init__(self, rate=5.0, burst=None, per_host=4):
+        """
+        参数:
+            rate: 所有线程合计每秒最多发出的请求数
+            burst: 允许的突发请求数，默认为 max(1, rate)
+            per_host: 对同一主机同时进行的请求数上限
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.per_host = per_host
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._host_slots.get(host)
+            if semaphore is None:
+                semaphore = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return semaphore
+
+    @contextmanager
+    def slot(self, url):
+        """
+        占用一个请求名额：先等待主机的并发名额，再取令牌
+
+        用法:
+            with limiter.slot(url):
+                response = session.get(url)
+        """
+        semaphore = self._host_semaphore(url)
+        with semaphore:
+            self.bucket.acquire()
+            yield
@@ -0,0 +1,72 @@
+"""
+爬虫响应缓存
+把成功请求的JSON响应保存在SQLite文件中，键为URL和排序后的查询参数；
+在有效期内重复请求时直接返回缓存，不访问网络
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+
+def cache_key(url, params=None):
+    """由URL和查询参数生成缓存键，参数顺序不影响结果"""
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+
+class ResponseCache:
+    """带有效期的SQLite响应缓存，可在多个线程间共享"""
+
+    def __init__(self, path, ttl=86400):
+        """
+        参数:
+            path: SQLite缓存文件路径
+            ttl: 缓存有效期（秒），为None时永不过期
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses '
+                           '(key TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL)')
+
+    def get(self, url, params=None):
+        """
+        读取缓存的响应
+
+        返回:
+            解析后的JSON数据，没有缓存或已过期时返回None
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT body, fetched_at FROM responses WHERE key = ?',
+                                     (cache_key(url, params),)).fetchone()
+        if row is None:
+            return None
+        body, fetched_at = row
+        if self.ttl is not None and time.time() - fetched_at > self.ttl:
+            return None
+        return json.loads(body)
+
+    def put(self, url, params, data):
+        """保存一次成功请求的JSON数据"""
+        body = json.dumps(data, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)',
+                               (cache_key(url, params), body, time.time()))
+
+    def purge_expired(self):
+        """删除已过期的缓存，返回删除的条数"""
+        if self.ttl is None:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute('DELETE FROM responses WHERE fetched_at < ?', (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,121 @@
+"""
+示例数据的分块写出
+按块生成数据并依次追加到CSV或Parquet文件，内存占用只与块大小有关；
+块较多时由多个进程并行生成和序列化
+
+每个块使用由同一个种子派生（SeedSequence.spawn）的独立随机数生成器，
+所以相同的种子和块大小总是生成相同的数据，与进程数无关
+"""
+
+import contextlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，只在写出Parquet时需要
+    pa = None
+    pq = None
+
+
+# 默认每块的行数
+DEFAULT_CHUNK_SIZE = 100000
+
+# 生成器返回完整DataFrame的最大行数，更大的数据只写入文件
+FULL_FRAME_MAX_ROWS = 1000000
+
+
+def output_format_for(output_file):
+    """根据文件扩展名判断输出格式：'parquet' 或 'csv'"""
+    return 'parquet' if output_file.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def _build_chunk(task):
+    """
+    生成一个块（在工作进程中运行）
+
+    CSV格式在工作进程中直接序列化为文本，主进程只负责按顺序写入；
+    需要返回给调用方的块（keep_df）同时返回DataFrame
+    """
+    make_chunk, seed, start, n_rows, output_format, is_first, keep_df = task
+    df = make_chunk(np.random.default_rng(seed), start, n_rows)
+    if output_format == 'csv':
+        return (df if keep_df else None), df.to_csv(index=False, header=is_first)
+    return df, None
+
+
+def write_chunks(make_chunk, n_samples, output_file, seed=42, chunk_size=DEFAULT_CHUNK_SIZE,
+                 n_workers=None, encoding='utf-8', collect=False):
+    """
+    分块生成数据并写入文件
+
+    参数:
+        make_chunk: 生成一个块的函数 make_chunk(rng, start, n_rows) -> DataFrame，
+            必须是模块级函数以便传给工作进程；start为该块第一行的全局行号
+        n_samples: 总行数
+        output_file: 输出文件路径，扩展名为 .parquet 时写Parquet，否则写CSV
+        seed: 随机种子
+        chunk_size: 每块的行数
+        n_workers: 并行生成的进程数，默认为CPU核心数（只有一个块时不启用多进程）
+        encoding: CSV文件编码
+        collect: 是否在内存中保留全部块并返回完整的DataFrame
+    返回:
+        collect为True时返回完整的DataFrame，否则返回第一个块的DataFrame（用于预览）
+    """
+    output_format = output_format_for(output_file)
+    if output_format == 'parquet' and pq is None:
+        raise ImportError("写出Parquet文件需要安装pyarrow: pip install pyarrow")
+
+    starts = list(range(0, n_samples, chunk_size)) or [0]
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [(make_chunk, chunk_seed, start, min(chunk_size, n_samples - start), output_format, i == 0,
+              collect or i == 0)
+             for i, (chunk_seed, start) in enumerate(zip(seeds, starts))]
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(tasks))
+    frames = []
+    writer = None
+    csv_file = open(output_file, 'w', encoding=encoding, newline='') if output_format == 'csv' else None
+    with csv_file or contextlib.nullcontext() as f:
+        try:
+            for df, text in _run_tasks(tasks, n_workers):
+                if collect or not frames:
+                    frames.append(df)
+                if output_format == 'csv':
+                    f.write(text)
+                else:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(output_file, table.schema)
+                    # 每块写成一个行组
+                    writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    if collect and len(frames) > 1:
+        return pd.concat(frames, ignore_index=True)
+    return frames[0]
+
+
+def _run_tasks(tasks, n_workers):
+    """按顺序返回各块的结果；同时在途的块数有上限，避免结果堆积在内存中"""
+    if n_workers < 2:
+        for task in tasks:
+            yield _build_chunk(task)
+        return
+
+    window = n_workers * 2
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        pending = [executor.submit(_build_chunk, task) for task in tasks[:window]]
+        next_task = len(pending)
+        while pending:
+            result = pending.pop(0).result()
+            if next_task < len(tasks):
+                pending.append(executor.submit(_build_chunk, tasks[next_task]))
+                next_task += 1
+            yield result
+
@@ -0,0 +1,93 @@
+"""
+爬虫断点记录
+在SQLite文件中记录本轮已处理完的歌单和已保存的歌曲ID，
+爬虫中断后可以跳过已处理的歌单继续，增量更新时只追加新歌曲
+
+同时记录最后一次写入后输出数据的签名（大小和修改时间，见 TrackSink.signature）：
+数据未被其他程序改动时直接使用记录的歌曲ID，不必重新读取整个输出文件
+"""
+
+import sqlite3
+
+
+# 每条SQL语句携带的ID数量（SQLite参数个数有上限）
+INSERT_BATCH_SIZE = 500
+
+
+class ScrapeCheckpoint:
+    """已处理歌单和已知歌曲ID的持久化记录"""
+
+    def __init__(self, path):
+        """
+        参数:
+            path: SQLite断点文件路径
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS playlists (playlist_id TEXT PRIMARY KEY)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS songs (song_id TEXT PRIMARY KEY)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def matches(self, signature):
+        """输出数据是否仍是最后一次记录时的状态（记录的歌曲ID与数据一致）"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'output'").fetchone()
+        return row is not None and row[0] == (signature or '')
+
+    def _set_output(self, signature):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('output', ?)", (signature or '',))
+
+    def set_output(self, signature):
+        """输出数据被重写但歌曲不变（如去重压缩）后更新签名"""
+        with self._conn:
+            self._set_output(signature)
+
+    def processed_playlists(self):
+        """本轮已处理完的歌单ID集合"""
+        return {row[0] for row in self._conn.execute('SELECT playlist_id FROM playlists')}
+
+    def known_song_ids(self):
+        """已保存的歌曲ID集合"""
+        return {row[0] for row in self._conn.execute('SELECT song_id FROM songs')}
+
+    def _add_song_ids(self, song_ids):
+        song_ids = [(str(song_id),) for song_id in song_ids]
+        for start in range(0, len(song_ids), INSERT_BATCH_SIZE):
+            self._conn.executemany('INSERT OR IGNORE INTO songs (song_id) VALUES (?)',
+                                   song_ids[start:start + INSERT_BATCH_SIZE])
+
+    def sync_songs(self, song_ids, signature):
+        """输出数据被其他程序改动后，用数据中的歌曲ID替换记录"""
+        with self._conn:
+            self._conn.execute('DELETE FROM songs')
+            self._add_song_ids(song_ids)
+            self._set_output(signature)
+
+    def mark_playlists(self, playlist_ids, song_ids, signature):
+        """
+        在一个事务中记录一批歌单已处理完、其中新保存的歌曲以及输出数据的当前签名
+
+        应在这些歌曲写入输出文件之后调用：如果在两者之间崩溃，文件状态与记录不符，
+        下次启动时会从文件重新读取歌曲ID，已写入的歌曲不会丢失也不会重复
+        """
+        with self._conn:
+            self._add_song_ids(song_ids)
+            self._conn.executemany('INSERT OR IGNORE INTO playlists (playlist_id) VALUES (?)',
+                                   [(str(playlist_id),) for playlist_id in playlist_ids])
+            self._set_output(signature)
+
+    def finish_run(self):
+        """本轮爬取完成：清空歌单记录，下次爬取重新检查所有歌单；歌曲ID保留用于增量更新"""
+        with self._conn:
+            self._conn.execute('DELETE FROM playlists')
+
+    def reset(self, signature):
+        """清空全部记录，开始全新的一轮爬取（输出文件已重新创建）"""
+        with self._conn:
+            self._conn.execute('DELETE FROM playlists')
+            self._conn.execute('DELETE FROM songs')
+            self._set_output(signature)
+
+    def close(self):
+        self._conn.close()
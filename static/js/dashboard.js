@@ -5,6 +5,7 @@ let albumTypeData = null;
 let publishTrendData = null;
 let topArtistsData = null;
 let sentimentData = null;
+let wordcloudUrl = null;  // 当前词云图的blob URL，替换图片前释放
 
 // 颜色方案
 const colors = ['#667eea', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#feca57', '#48dbfb', '#ff9ff3', '#54a0ff', '#00d2d3'];
@@ -12,142 +13,121 @@ const colors = ['#667eea', '#f093fb', '#4facfe', '#43e97b', '#fa709a', '#feca57'
 // 页面加载时初始化
 window.addEventListener('DOMContentLoaded', function() {
     console.log('页面加载完成，开始初始化...');
-    checkStatus();
     loadAllData();
 });
 
-// 检查数据状态
-async function checkStatus() {
-    try {
-        const response = await fetch('/api/status');
-        const data = await response.json();
-        
-        const statusElement = document.getElementById('dataStatus');
-        const sourceElement = document.getElementById('dataSource');
+// 首屏一次请求获取的面板（词云图较慢，单独加载）
+const dashboardFields = [
+    'status', 'music_type_distribution', 'album_type_analysis', 'album_type_top10',
+    'publish_trend', 'top_artists', 'sentiment_trend'
+];
+
+// 通过批量接口获取多个面板的数据
+// 页面地址中的筛选参数（如 /?music_type=流行&year_from=2015）会转发给批量接口
+const filterParams = ['music_type', 'album_type', 'artist', 'year_from', 'year_to'];
+
+async function fetchDashboard(fields) {
+    const params = new URLSearchParams({fields: fields.join(','), top: 5});
+    const pageParams = new URLSearchParams(window.location.search);
+    filterParams.forEach(name => {
+        pageParams.getAll(name).forEach(value => params.append(name, value));
+    });
+    const response = await fetch(`/api/dashboard?${params}`);
+    return response.json();
+}
+
+// 面板是否返回了有效数据
+function isPanelData(panel) {
+    return panel && !panel.error;
+}
+
+// 显示数据状态
+function renderStatus(data) {
+    const statusElement = document.getElementById('dataStatus');
+    const sourceElement = document.getElementById('dataSource');
+    
+    if (data.loaded) {
+        statusElement.textContent = '✓ 已加载';
+        statusElement.classList.add('loaded');
+        statusElement.classList.remove('error');
         
-        if (data.loaded) {
-            statusElement.textContent = '✓ 已加载';
-            statusElement.classList.add('loaded');
-            statusElement.classList.remove('error');
-            
-            if (data.is_netease_data) {
-                sourceElement.textContent = '网易云音乐';
-                sourceElement.classList.add('loaded');
-            } else {
-                sourceElement.textContent = 'Spotify';
-                sourceElement.classList.add('loaded');
-            }
+        if (data.is_netease_data) {
+            sourceElement.textContent = '网易云音乐';
+            sourceElement.classList.add('loaded');
         } else {
-            statusElement.textContent = '✗ 未加载';
-            statusElement.classList.add('error');
-            statusElement.classList.remove('loaded');
-            showDataFileInfo();
+            sourceElement.textContent = 'Spotify';
+            sourceElement.classList.add('loaded');
         }
-    } catch (error) {
-        console.error('检查状态失败:', error);
+    } else {
+        statusElement.textContent = '✗ 未加载';
+        statusElement.classList.add('error');
+        statusElement.classList.remove('loaded');
+        showDataFileInfo();
     }
 }
 
 // 加载所有数据
 async function loadAllData() {
-    await loadMusicTypeData();
-    await loadAlbumTypeData();
-    await loadPublishTrendData();
-    await loadTopArtistsData();
-    await loadSentimentData();
-    await loadWordcloud();
-}
-
-// 加载音乐类型数据
-async function loadMusicTypeData() {
     try {
-        const response = await fetch('/api/music-type-distribution');
-        if (response.ok) {
-            musicTypeData = await response.json();
+        const data = await fetchDashboard(dashboardFields);
+        renderStatus(data.status);
+        
+        if (isPanelData(data.music_type_distribution)) {
+            musicTypeData = data.music_type_distribution;
             renderMusicTypeChart();
         }
-    } catch (error) {
-        console.error('加载音乐类型数据失败:', error);
-    }
-}
-
-// 加载专辑类型数据
-async function loadAlbumTypeData() {
-    try {
-        const response = await fetch('/api/album-type-analysis');
-        if (response.ok) {
-            albumTypeData = await response.json();
+        
+        if (isPanelData(data.album_type_analysis)) {
+            albumTypeData = data.album_type_analysis;
             renderAlbumTypeChart();
             renderAlbumStatsTable();
         }
         
-        const top10Response = await fetch('/api/album-type-top10');
-        if (top10Response.ok) {
-            const top10Data = await top10Response.json();
-            renderAlbumTop10Chart(top10Data);
+        if (isPanelData(data.album_type_top10)) {
+            renderAlbumTop10Chart(data.album_type_top10);
         }
-    } catch (error) {
-        console.error('加载专辑类型数据失败:', error);
-    }
-}
-
-// 加载发布趋势数据
-async function loadPublishTrendData() {
-    try {
-        const response = await fetch('/api/publish-trend');
-        if (response.ok) {
-            publishTrendData = await response.json();
+        
+        if (isPanelData(data.publish_trend)) {
+            publishTrendData = data.publish_trend;
             renderPublishTrendChart();
         }
-    } catch (error) {
-        console.error('加载发布趋势数据失败:', error);
-    }
-}
-
-// 加载TOP作者数据
-async function loadTopArtistsData() {
-    try {
-        const response = await fetch('/api/top-artists?top=5');
-        if (response.ok) {
-            topArtistsData = await response.json();
+        
+        if (isPanelData(data.top_artists)) {
+            topArtistsData = data.top_artists;
             renderTopArtistsChart();
             renderArtistsTable();
         }
-    } catch (error) {
-        console.error('加载作者数据失败:', error);
-    }
-}
-
-// 加载情感分析数据
-async function loadSentimentData() {
-    try {
-        const response = await fetch('/api/sentiment-trend');
-        if (response.ok) {
-            sentimentData = await response.json();
+        
+        if (isPanelData(data.sentiment_trend)) {
+            sentimentData = data.sentiment_trend;
             renderSentimentDistChart();
             renderSentimentTrendChart();
         }
     } catch (error) {
-        console.error('加载情感数据失败:', error);
+        console.error('加载看板数据失败:', error);
     }
+    
+    await loadWordcloud();
 }
 
-// 加载词云图
+// 加载词云图（服务端按数据版本缓存PNG）
 async function loadWordcloud() {
     try {
-        const response = await fetch('/api/wordcloud');
+        const response = await fetch('/api/wordcloud.png');
+        const container = document.getElementById('wordcloudContainer');
+        
         if (response.ok) {
+            const blob = await response.blob();
+            if (wordcloudUrl) {
+                URL.revokeObjectURL(wordcloudUrl);
+            }
+            wordcloudUrl = URL.createObjectURL(blob);
+            container.innerHTML = `<img src="${wordcloudUrl}" alt="词云图">`;
+        } else {
+            // Fallback: 显示词频列表
             const data = await response.json();
-            const container = document.getElementById('wordcloudContainer');
-            
-            if (data.image) {
-                if (typeof data.image === 'string' && data.image.startsWith('data:image')) {
-                    // Base64图片
-                    container.innerHTML = `<img src="${data.image}" alt="词云图">`;
-                } else if (data.image.word_freq) {
-                    // Fallback: 显示词频列表
-                    renderWordFrequencyFallback(data.image.word_freq, container);
-                }
+            if (data.word_freq) {
+                renderWordFrequencyFallback(data.word_freq, container);
             }
         }
     } catch (error) {
@@ -502,15 +482,13 @@ async function reloadData() {
     btn.textContent = '🔄 加载中...';
     
     try {
-        const response = await fetch('/api/reload');
-        const data = await response.json();
+        const data = await runReload(btn);
         
         if (data.success) {
-            await checkStatus();
             await loadAllData();
             showSuccess('数据重新加载成功！');
         } else {
-            showError('数据加载失败，请检查数据文件');
+            showError(data.error || '数据加载失败，请检查数据文件');
         }
     } catch (error) {
         console.error('重新加载失败:', error);
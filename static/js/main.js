@@ -286,15 +286,14 @@ async function reloadData() {
     btn.textContent = '🔄 加载中...';
     
     try {
-        const response = await fetch('/api/reload');
-        const data = await response.json();
+        const data = await runReload(btn);
         
         if (data.success) {
             await checkStatus();
             await loadData();
             showSuccess('数据重新加载成功！');
         } else {
-            showError('数据加载失败，请检查数据文件');
+            showError(data.error || '数据加载失败，请检查数据文件');
         }
     } catch (error) {
         console.error('重新加载失败:', error);
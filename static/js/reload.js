@@ -0,0 +1,40 @@
+// 主页和看板共用的后台重新加载进度显示
+
+// 重新加载各阶段的显示名称，与 MusicDataProcessor.process_pipeline 中的阶段一一对应
+const reloadStageNames = {
+    'load': '读取数据',
+    'filter_index': '建立筛选索引',
+    'tokenize': '歌名分词',
+    'load_model': '读取模型',
+    'extract_features': '提取特征',
+    'standardize': '标准化',
+    'neighbor_index': '建立索引',
+    'cluster': '聚类',
+    'save_model': '保存模型',
+    'snapshot': '生成分析结果',
+    'done': '完成'
+};
+
+// 轮询后台重新加载的进度，直到完成
+async function waitForReload(btn) {
+    while (true) {
+        const response = await fetch('/api/reload/status');
+        const status = await response.json();
+        if (!status.running) {
+            return status;
+        }
+        
+        const stageName = reloadStageNames[status.stage] || '加载中';
+        btn.textContent = `🔄 ${stageName}... (${Math.round(status.elapsed)}秒)`;
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+}
+
+// 启动后台重新加载并等待完成；服务端拒绝时（如gunicorn多进程模式）直接返回带error的结果
+async function runReload(btn) {
+    const response = await fetch('/api/reload');
+    if (!response.ok) {
+        return await response.json();
+    }
+    return await waitForReload(btn);
+}
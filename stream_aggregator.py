@@ -0,0 +1,132 @@
+"""
+网易云音乐数据的流式统计
+按块读取CSV并增量累积各项分析所需的计数与求和，无需把完整数据载入内存
+"""
+
+import pandas as pd
+
+from artist_index import split_artists
+
+
+class NetEaseStreamAggregator:
+    """逐块累积专辑类型、音乐类型、作者、年份和歌名的统计量"""
+
+    # 需要按组统计数量和人气的列
+    GROUP_COLUMNS = ('album_type', 'music_type', 'artist_name')
+
+    def __init__(self):
+        self.total_rows = 0
+        self.columns = set()
+        self.group_stats = {}  # 列名 -> DataFrame(count, pop_sum, pop_n)
+        self.year_counts = None
+        self.title_counts = None
+        self._artist_ranking = None  # 拆分合作歌曲后按作品数排序的作者统计，首次查询时计算
+
+    @staticmethod
+    def _accumulate(total, part):
+        """把一个块的统计结果累加到总量上"""
+        if total is None:
+            return part
+        return total.add(part, fill_value=0)
+
+    def update(self, chunk):
+        """
+        累积一个数据块
+
+        参数:
+            chunk: 从CSV读取的DataFrame块
+        """
+        self.total_rows += len(chunk)
+        self.columns.update(chunk.columns)
+        self._artist_ranking = None
+
+        for col in self.GROUP_COLUMNS:
+            if col not in chunk.columns:
+                continue
+            stats = pd.DataFrame({'count': chunk[col].value_counts()})
+            if 'popularity' in chunk.columns:
+                grouped = chunk.groupby(col)['popularity']
+                stats['pop_sum'] = grouped.sum()
+                stats['pop_n'] = grouped.count()
+            self.group_stats[col] = self._accumulate(self.group_stats.get(col), stats)
+
+        if 'publish_year' in chunk.columns:
+            years = chunk['publish_year']
+            self.year_counts = self._accumulate(self.year_counts, years[years > 0].value_counts())
+
+        title_col = 'song_name' if 'song_name' in chunk.columns else 'name'
+        if title_col in chunk.columns:
+            titles = chunk[title_col].astype(str).value_counts()
+            self.title_counts = self._accumulate(self.title_counts, titles)
+
+    def _sorted_group(self, col):
+        """按数量降序返回某列的分组统计"""
+        stats = self.group_stats.get(col)
+        if stats is None:
+            return None
+        return stats.sort_values('count', ascending=False, kind='stable')
+
+    @staticmethod
+    def _avg_popularity(row):
+        if 'pop_n' not in row or not row['pop_n']:
+            return float('nan')
+        return float(row['pop_sum'] / row['pop_n'])
+
+    def album_type_analysis(self):
+        """专辑类型分布及平均人气，结构与MusicDataProcessor一致"""
+        stats = self._sorted_group('album_type')
+        if stats is None:
+            return None
+
+        return [{
+            'type': album_type,
+            'count': int(row['count']),
+            'percentage': float(row['count'] / self.total_rows * 100),
+            'avg_popularity': self._avg_popularity(row)
+        } for album_type, row in stats.iterrows()]
+
+    def music_type_distribution(self):
+        """音乐类型分布"""
+        stats = self._sorted_group('music_type')
+        if stats is None:
+            return None
+
+        return [{
+            'type': music_type,
+            'count': int(row['count']),
+            'percentage': float(row['count'] / self.total_rows * 100)
+        } for music_type, row in stats.iterrows()]
+
+    def publish_trend(self):
+        """按年份统计的发布数量"""
+        if self.year_counts is None:
+            return None
+
+        return [{'year': int(year), 'count': int(count)}
+                for year, count in self.year_counts.sort_index().items()]
+
+    def top_artists(self, top_n=5):
+        """
+        作品数量最多的前N名作者，top_n为None时返回全部
+
+        合作歌曲拆分后计入每一位作者名下，排序规则与ArtistIndex一致；
+        排名只计算一次，之后每次查询只取前N行
+        """
+        stats = self.group_stats.get('artist_name')
+        if stats is None:
+            return None
+
+        if self._artist_ranking is None:
+            stats = stats.assign(artist=[split_artists(credit) for credit in stats.index])
+            stats = stats.explode('artist').dropna(subset=['artist'])
+            stats = stats.groupby('artist').sum(numeric_only=True)
+            self._artist_ranking = stats.sort_values('count', ascending=False, kind='stable')
+        stats = self._artist_ranking
+        if top_n is not None:
+            stats = stats.head(top_n)
+
+        return [{
+            'artist': artist,
+            'count': int(row['count']),
+            'avg_popularity': self._avg_popularity(row)
+        } for artist, row in stats.iterrows()]
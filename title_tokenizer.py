@@ -0,0 +1,125 @@
+"""
+歌曲名称分词
+每个不同的歌名只分词一次，结果持久化保存；新歌名较多时分发到多个进程并行分词
+
+工作进程以spawn方式启动：分词可能在后台重新加载线程中进行，
+从多线程的进程中fork子进程可能复制到被其他线程持有的锁
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import jieba
+
+
+# 每条SQL查询携带的歌名数量（SQLite参数个数有上限）
+QUERY_BATCH_SIZE = 500
+
+# 默认最多使用的分词进程数
+MAX_WORKERS = 4
+
+
+def _cut_titles(titles):
+    """对一批歌名分词（在工作进程中运行）"""
+    return [list(jieba.cut(title)) for title in titles]
+
+
+class TitleTokenizer:
+    """带持久化缓存的歌名分词器"""
+
+    def __init__(self, cache_path=None, n_workers=None, parallel_threshold=5000, chunk_size=2000):
+        """
+        参数:
+            cache_path: SQLite缓存文件路径，为None时只在内存中分词
+            n_workers: 并行分词的进程数，默认为CPU核心数，但不超过MAX_WORKERS
+            parallel_threshold: 新歌名超过该数量时才启用多进程
+            chunk_size: 分发给每个工作进程的歌名数量
+        """
+        self.cache_path = cache_path
+        self.n_workers = n_workers or min(os.cpu_count() or 1, MAX_WORKERS)
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+
+    def _connect(self):
+        conn = sqlite3.connect(self.cache_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS title_tokens (title TEXT PRIMARY KEY, tokens TEXT NOT NULL)')
+        return conn
+
+    def _load_cached(self, conn, titles):
+        """从缓存读取已分词的歌名"""
+        cached = {}
+        for start in range(0, len(titles), QUERY_BATCH_SIZE):
+            batch = titles[start:start + QUERY_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f'SELECT title, tokens FROM title_tokens WHERE title IN ({placeholders})', batch)
+            for title, tokens in rows:
+                cached[title] = json.loads(tokens)
+        return cached
+
+    def _cut(self, titles):
+        """对新歌名分词，数量较多时使用进程池"""
+        if len(titles) < self.parallel_threshold or self.n_workers < 2:
+            return _cut_titles(titles)
+
+        chunks = [titles[i:i + self.chunk_size] for i in range(0, len(titles), self.chunk_size)]
+        n_workers = min(self.n_workers, len(chunks))
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+            results = []
+            for tokens in executor.map(_cut_titles, chunks):
+                results.extend(tokens)
+        return results
+
+    def tokenize(self, titles):
+        """
+        对一组不同的歌名分词
+
+        参数:
+            titles: 不重复的歌名列表
+        返回:
+            歌名到分词结果的字典
+        """
+        titles = list(titles)
+        conn = self._connect() if self.cache_path else None
+        try:
+            tokens = self._load_cached(conn, titles) if conn is not None else {}
+            new_titles = [title for title in titles if title not in tokens]
+
+            if new_titles:
+                new_tokens = self._cut(new_titles)
+                tokens.update(zip(new_titles, new_tokens))
+                if conn is not None:
+                    with conn:
+                        conn.executemany(
+                            'INSERT OR REPLACE INTO title_tokens (title, tokens) VALUES (?, ?)',
+                            [(title, json.dumps(words, ensure_ascii=False))
+                             for title, words in zip(new_titles, new_tokens)])
+                print(f"歌名分词: 新分词 {len(new_titles)} 个，缓存命中 {len(titles) - len(new_titles)} 个")
+            return tokens
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def word_frequencies(self, title_counts, min_length=2):
+        """
+        按歌名出现次数加权统计词频
+
+        参数:
+            title_counts: 歌名到出现次数的映射（如Series.value_counts()的结果）
+            min_length: 词的最短长度，用于过滤单字
+        返回:
+            Counter
+        """
+        tokens = self.tokenize(title_counts.keys())
+        word_freq = Counter()
+        for title, count in title_counts.items():
+            for word in tokens[title]:
+                if len(word) >= min_length:
+                    word_freq[word] += int(count)
+        return word_freq
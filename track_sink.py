@@ -0,0 +1,255 @@
+"""
+爬虫输出的流式写入
+爬取过程中按批把歌曲（或评论）写入CSV、JSONL或Parquet，内存中只保留一批数据；
+爬取结束后可按song_id（评论按comment_id）去重压缩
+
+Parquet文件写完后不能再追加，所以每批写成 <输出文件>.parts/ 目录下的一个分片文件
+（一个行组），压缩时再把已有的输出文件和全部分片合并为一个文件
+"""
+
+import json
+import os
+import shutil
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，只在输出Parquet时需要
+    pa = None
+    pq = None
+
+
+# 每批写入的记录数
+DEFAULT_BATCH_SIZE = 1000
+
+# 压缩时每次读取的行数
+COMPACT_CHUNK_SIZE = 100000
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+
+def sink_format_for(output_file):
+    """根据文件扩展名判断输出格式：'jsonl'、'parquet' 或 'csv'"""
+    lower = output_file.lower()
+    if lower.endswith(JSONL_EXTENSIONS):
+        return 'jsonl'
+    if lower.endswith(PARQUET_EXTENSIONS):
+        return 'parquet'
+    return 'csv'
+
+
+def _parts_dir(output_file):
+    return f'{output_file}.parts'
+
+
+def _parquet_sources(output_file):
+    """Parquet输出的全部文件：已合并的输出文件在前，分片按写入顺序在后"""
+    sources = [output_file] if os.path.exists(output_file) else []
+    parts_dir = _parts_dir(output_file)
+    if os.path.isdir(parts_dir):
+        sources.extend(os.path.join(parts_dir, name) for name in sorted(os.listdir(parts_dir))
+                       if name.endswith('.parquet'))
+    return sources
+
+
+def iter_chunks(output_file, columns=None, chunk_size=COMPACT_CHUNK_SIZE):
+    """按块读取输出数据（Parquet包括分片），每块为一个DataFrame"""
+    output_format = sink_format_for(output_file)
+    if output_format == 'parquet':
+        for source in _parquet_sources(output_file):
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+    elif os.path.exists(output_file):
+        if output_format == 'jsonl':
+            reader = pd.read_json(output_file, lines=True, chunksize=chunk_size, dtype=False)
+        else:
+            reader = pd.read_csv(output_file, encoding='utf-8-sig', chunksize=chunk_size, usecols=columns,
+                                 dtype=str, keep_default_na=False)
+        with reader:
+            for chunk in reader:
+                yield chunk if columns is None or output_format == 'csv' else chunk[columns]
+
+
+def remove_output(output_file):
+    """删除输出文件及其Parquet分片"""
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    if os.path.isdir(_parts_dir(output_file)):
+        shutil.rmtree(_parts_dir(output_file))
+
+
+class TrackSink:
+    """按批写入记录（歌曲表或评论表）"""
+
+    def __init__(self, output_file, columns, append=False):
+        """
+        参数:
+            output_file: 输出文件路径，扩展名为 .jsonl 时写JSONL，为 .parquet 时写Parquet（需要pyarrow），否则写CSV
+            columns: 新建文件时的列
+            append: 是否保留已有数据；已有文件的列顺序与columns不同时按已有的列写入
+        """
+        self.output_file = output_file
+        self.format = sink_format_for(output_file)
+        if self.format == 'parquet' and pq is None:
+            raise ImportError("输出Parquet文件需要安装pyarrow: pip install pyarrow")
+
+        self._buffer = []
+        self._schema = None
+        if not append:
+            self._remove_existing()
+
+        self.columns = self._existing_columns() or list(columns)
+        if self.format == 'csv' and not os.path.exists(output_file):
+            pd.DataFrame(columns=self.columns).to_csv(output_file, index=False, encoding='utf-8-sig')
+        elif self.format == 'jsonl' and not os.path.exists(output_file):
+            open(output_file, 'w', encoding='utf-8').close()
+
+    def _remove_existing(self):
+        remove_output(self.output_file)
+
+    def _existing_columns(self):
+        """已有数据的列，没有数据时返回None（JSONL没有表头，使用传入的列）"""
+        if self.format == 'csv' and os.path.exists(self.output_file):
+            return list(pd.read_csv(self.output_file, nrows=0, encoding='utf-8-sig').columns)
+        if self.format == 'parquet':
+            sources = _parquet_sources(self.output_file)
+            if sources:
+                self._schema = pq.read_schema(sources[0])
+                return [name for name in self._schema.names if not name.startswith('__index_level_')]
+        return None
+
+    def existing_song_ids(self, key='song_id'):
+        """已写入的全部歌曲ID（字符串）"""
+        if key not in self.columns:
+            return set()
+        song_ids = set()
+        for chunk in iter_chunks(self.output_file, columns=[key]):
+            song_ids.update(str(value) for value in chunk[key].dropna())
+        return song_ids
+
+    def signature(self):
+        """输出数据的大小和修改时间，用于判断文件是否被其他程序改动过"""
+        paths = _parquet_sources(self.output_file) if self.format == 'parquet' else [self.output_file]
+        parts = []
+        for path in paths:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}')
+        return '|'.join(parts) or None
+
+    @property
+    def buffered(self):
+        """尚未写入文件的记录数"""
+        return len(self._buffer)
+
+    def write(self, records):
+        """把记录放入缓冲区，调用flush时才写入文件"""
+        self._buffer.extend(records)
+
+    def flush(self):
+        """把缓冲区中的记录作为一批写入文件"""
+        if not self._buffer:
+            return
+        df = pd.DataFrame(self._buffer).reindex(columns=self.columns)
+        if self.format == 'csv':
+            df.to_csv(self.output_file, mode='a', header=False, index=False, encoding='utf-8-sig')
+        elif self.format == 'jsonl':
+            with open(self.output_file, 'a', encoding='utf-8') as f:
+                for record in df.to_dict('records'):
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        else:
+            self._write_part(df)
+        self._buffer = []
+
+    def _write_part(self, df):
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._schema is None:
+            self._schema = table.schema
+
+        parts_dir = _parts_dir(self.output_file)
+        os.makedirs(parts_dir, exist_ok=True)
+        part_path = os.path.join(parts_dir, f'part-{len(os.listdir(parts_dir)):06d}.parquet')
+        # 先写临时文件再改名，分片要么完整要么不存在
+        pq.write_table(table, part_path + '.tmp')
+        os.replace(part_path + '.tmp', part_path)
+
+    def close(self):
+        self.flush()
+
+
+def compact_tracks(output_file, key='song_id', chunk_size=COMPACT_CHUNK_SIZE):
+    """
+    按key去重压缩输出文件，重复的记录保留最先写入的一条
+
+    按块读取并写入临时文件，内存中只保留一块数据和已出现的key；
+    Parquet输出同时把分片合并进输出文件，每块写成一个行组
+
+    参数:
+        output_file: 输出文件路径
+        key: 去重的列
+        chunk_size: 每次读取的行数
+    返回:
+        (压缩前行数, 压缩后行数)
+    """
+    output_format = sink_format_for(output_file)
+    if output_format == 'parquet' and pq is None:
+        raise ImportError("压缩Parquet文件需要安装pyarrow: pip install pyarrow")
+    if output_format == 'parquet' and not _parquet_sources(output_file):
+        # 还没有写入任何数据（如全部请求失败，或新歌曲都没有评论）
+        return 0, 0
+
+    tmp_file = f'{output_file}.compact'
+    seen = set()
+    total = kept = 0
+    writer = None
+    out = None
+    try:
+        if output_format == 'jsonl':
+            # 逐行处理，原样保留未重复的行
+            out = open(tmp_file, 'w', encoding='utf-8')
+            with open(output_file, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    total += 1
+                    value = str(json.loads(line).get(key))
+                    if value not in seen:
+                        seen.add(value)
+                        out.write(line)
+                        kept += 1
+        else:
+            schema = pq.read_schema(_parquet_sources(output_file)[0]) if output_format == 'parquet' else None
+            for chunk in iter_chunks(output_file, chunk_size=chunk_size):
+                total += len(chunk)
+                keep = []
+                for value in chunk[key].astype(str):
+                    keep.append(value not in seen)
+                    seen.add(value)
+                chunk = chunk[keep]
+                kept += len(chunk)
+                if output_format == 'csv':
+                    if out is None:
+                        out = open(tmp_file, 'w', encoding='utf-8-sig', newline='')
+                        out.write(chunk.iloc[:0].to_csv(index=False))
+                    chunk.to_csv(out, header=False, index=False)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_file, schema)
+                    writer.write_table(table)
+    finally:
+        if out is not None:
+            out.close()
+        if writer is not None:
+            writer.close()
+
+    if out is None and writer is None:
+        return total, kept
+    os.replace(tmp_file, output_file)
+    if output_format == 'parquet' and os.path.isdir(_parts_dir(output_file)):
+        shutil.rmtree(_parts_dir(output_file))
+    print(f"✓ 压缩 {output_file}: {total} 条记录，去掉 {total - kept} 条重复")
+    return total, kept
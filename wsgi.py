@@ -0,0 +1,16 @@
+"""
+生产环境入口
+在gunicorn主进程中加载数据并完成聚类（preload），工作进程fork后直接共享
+
+运行方式:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import app as application
+
+
+app = application.app
+
+# 把大数组换成缓存文件的内存映射，工作进程之间共享同一份物理内存（之后的重新加载同样如此）
+application.REMAP_FROM_CACHE = True
+application.initialize_processor()